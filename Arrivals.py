@@ -0,0 +1,285 @@
+import os
+import numpy as np
+
+# each row represents a row in the given arrival rates table (clients per hour)
+MORNING = [150, 400, 90, 84, 60, 120, 60, 36]
+AFTERNOON = [90, 120, 150, 84, 60, 400, 60, 36]
+OTHER = [60, 70, 60, 84, 60, 70, 60, 36]
+# each tuple represents a cell in the given arrival rates table, (low, high) floor range
+SOURCES = [(0, 1), (0, 1), (1, 16), (1, 16), (1, 16), (16, 26), (16, 26), (16, 26)]
+DESTINATIONS = [(1, 16), (16, 26), (0, 1), (1, 16), (16, 26), (0, 1), (1, 16), (16, 26)]
+# time of day regimes, (start, end, arrival rates), morning 7:00-10:00 and afternoon 15:00-18:00
+PERIODS = [(21600, 25200, OTHER), (25200, 36000, MORNING), (36000, 54000, OTHER),
+           (54000, 64800, AFTERNOON), (64800, 72000, OTHER)]
+DAY = 24 * 60 * 60  # seconds in a day
+TRACE_COLUMNS = ("time", "source", "destination")  # file names of the trace columns, without .npy
+
+
+class ArrivalStream:
+    def __init__(self, start=21600, end=72000, periods=PERIODS, sources=SOURCES, destinations=DESTINATIONS):
+        """
+        generates a whole day of arrivals as a piecewise non-homogeneous Poisson process
+        :param start: start of the day in seconds
+        :param end: end of the day in seconds
+        :param periods: (start, end, arrival rates per hour of every table row) of every time of day
+        :param sources: (low, high) source floor range of every table row
+        :param destinations: (low, high) destination floor range of every table row
+        """
+        self.start = start
+        self.end = end
+        self.periods = [(max(p_start, start), min(p_end, end), rates) for p_start, p_end, rates in periods
+                        if p_start < end and p_end > start]
+        # cumulative row probabilities per period, used to pick table rows for all arrivals at once
+        self.cum_probs = np.array([np.cumsum(rates) / sum(rates) for _, _, rates in self.periods])
+        self.cum_probs[:, -1] = 1.0
+        self.src_low = np.array([low for low, _ in sources])
+        self.src_high = np.array([high for _, high in sources])
+        self.dst_low = np.array([low for low, _ in destinations])
+        self.dst_high = np.array([high for _, high in destinations])
+        self.times = np.empty(0)  # arrival times of the day
+        self.sources = np.empty(0, dtype=int)  # source floor of each arrival
+        self.destinations = np.empty(0, dtype=int)  # destination floor of each arrival
+        self.index = 0  # next arrival to be read
+        self._arrivals = []
+
+    def __len__(self):
+        return len(self.times)
+
+    def generate(self, rng, day=0):
+        """
+        draw the day's arrivals (times, source floors, destination floors) in a few batched calls
+        :param rng: numpy Generator of the arrivals stream
+        :param day: day index, not used, the day's randomness comes from rng
+        :return: None
+        """
+        lengths = np.array([p_end - p_start for p_start, p_end, _ in self.periods])
+        rates = np.array([sum(rates) / 3600 for _, _, rates in self.periods])
+        counts = rng.poisson(rates * lengths)
+        period = np.repeat(np.arange(len(self.periods)), counts)
+        starts = np.array([p_start for p_start, _, _ in self.periods])
+        # given the count, arrival times in a period are uniform
+        times = starts[period] + rng.random(len(period)) * lengths[period]
+        order = np.argsort(times, kind="stable")
+        times = times[order]
+        period = period[order]
+        # pick the row of the arrivals table by the probabilities of the arrival's period
+        rows = (rng.random(len(period))[:, None] >= self.cum_probs[period]).sum(axis=1)
+        sources = rng.integers(self.src_low[rows], self.src_high[rows])
+        destinations = rng.integers(self.dst_low[rows], self.dst_high[rows])
+        # if we created the client's desired floor as his arrival floor, choose another floor
+        same = np.flatnonzero(sources == destinations)
+        while len(same):
+            destinations[same] = rng.integers(self.dst_low[rows[same]], self.dst_high[rows[same]])
+            same = same[sources[same] == destinations[same]]
+        self.times = times
+        self.sources = sources
+        self.destinations = destinations
+        self.index = 0
+        self._arrivals = list(zip(times.tolist(), sources.tolist(), destinations.tolist()))
+
+    def next_arrival(self):
+        """
+        read the next arrival of the day
+        :return: tuple of (arrival time, source floor, destination floor), None if the day has no more arrivals
+        """
+        if self.index >= len(self._arrivals):
+            return None
+        arrival = self._arrivals[self.index]
+        self.index += 1
+        return arrival
+
+    def describe(self):
+        """
+        :return: json description of arrivals that are not random, None since the arrivals come from the seed
+        """
+        return None
+
+
+class TraceStream:
+    def __init__(self, path, start=21600, end=72000, first_day=0, chunk=4096):
+        """
+        replays recorded arrivals, a trace is a directory of 3 .npy columns of the same length:
+            time.npy: float, seconds from midnight of the trace's first day, sorted
+            source.npy, destination.npy: int, floors
+        the columns are memory mapped, a day is found by binary search and read in chunks,
+        so memory doesn't grow with the length of the trace
+        :param path: trace directory, see TraceStream.write
+        :param start: start of the simulated day in seconds, earlier arrivals are skipped
+        :param end: end of the simulated day in seconds, later arrivals are skipped
+        :param first_day: trace day of day index 0
+        :param chunk: number of rows read at once
+        """
+        self.path = path
+        self.start = start
+        self.end = end
+        self.first_day = first_day
+        self.chunk = chunk
+        self.open()
+
+    def open(self):
+        self.columns = [np.load(os.path.join(self.path, name + ".npy"), mmap_mode="r") for name in TRACE_COLUMNS]
+        if len({len(column) for column in self.columns}) != 1:
+            raise ValueError("Trace columns of {} have different lengths".format(self.path))
+        self.low = self.high = 0  # rows of the current day
+        self.base = 0  # time of midnight of the current day
+        self._arrivals = []  # current chunk
+        self.index = 0  # next arrival in the chunk
+
+    def __getstate__(self):  # the memory mapped columns are opened again, not pickled
+        return {"path": self.path, "start": self.start, "end": self.end, "first_day": self.first_day,
+                "chunk": self.chunk, "day": (self.low, self.high, self.base),
+                "chunk_state": (self._arrivals, self.index)}
+
+    def __setstate__(self, state):
+        low, high, base = state.pop("day")
+        arrivals, index = state.pop("chunk_state")
+        self.__dict__.update(state)
+        self.open()
+        self.low, self.high, self.base = low, high, base
+        self._arrivals, self.index = arrivals, index
+
+    def __len__(self):
+        return len(self.columns[0])
+
+    def days(self):
+        """
+        :return: number of days in the trace, from first_day
+        """
+        if not len(self):
+            return 0
+        return int(self.columns[0][-1] // DAY) + 1 - self.first_day
+
+    def generate(self, rng, day=0):
+        """
+        find the arrivals of a day
+        :param rng: not used, the arrivals are recorded
+        :param day: day index
+        :return: None
+        """
+        times = self.columns[0]
+        self.base = (self.first_day + day) * DAY
+        self.low = int(np.searchsorted(times, self.base + self.start, side="left"))
+        self.high = int(np.searchsorted(times, self.base + self.end, side="right"))
+        self._arrivals = []
+        self.index = 0
+
+    def read_chunk(self):
+        """
+        read the next rows of the day, clients whose source and destination are the same floor are skipped
+        :return: False if the day has no more rows
+        """
+        while self.low < self.high:
+            rows = slice(self.low, min(self.low + self.chunk, self.high))
+            self.low = rows.stop
+            times, sources, destinations = (column[rows] for column in self.columns)  # views of the mapped files
+            trips = sources != destinations
+            self._arrivals = list(zip((times[trips] - self.base).tolist(), sources[trips].tolist(),
+                                      destinations[trips].tolist()))
+            self.index = 0
+            if self._arrivals:
+                return True
+        return False
+
+    def next_arrival(self):
+        """
+        read the next arrival of the day
+        :return: tuple of (arrival time, source floor, destination floor), None if the day has no more arrivals
+        """
+        if self.index >= len(self._arrivals) and not self.read_chunk():
+            return None
+        arrival = self._arrivals[self.index]
+        self.index += 1
+        return arrival
+
+    def describe(self):
+        """
+        :return: json description of the trace, part of the result cache key
+        """
+        stat = os.stat(os.path.join(self.path, TRACE_COLUMNS[0] + ".npy"))
+        return {"trace": os.path.abspath(self.path), "size": stat.st_size, "mtime": stat.st_mtime,
+                "first_day": self.first_day}
+
+    @staticmethod
+    def write(path, times, sources, destinations):
+        """
+        write a trace directory
+        :param path: directory
+        :param times: arrival times, seconds from midnight of the first day, sorted
+        :param sources: source floors
+        :param destinations: destination floors
+        :return: None
+        """
+        times = np.asarray(times, dtype=np.float64)
+        if len(times) and np.any(np.diff(times) < 0):
+            raise ValueError("Trace times must be sorted")
+        os.makedirs(path, exist_ok=True)
+        for name, column in zip(TRACE_COLUMNS, (times, np.asarray(sources, dtype=np.int16),
+                                                np.asarray(destinations, dtype=np.int16))):
+            np.save(os.path.join(path, name + ".npy"), column)
+
+
+class SharedArrivals:
+    def __init__(self, stream):
+        """
+        a day of arrivals read once from a stream and replayed by several simulations, see Simulation.compare
+        every simulation reads through its own view, the day is generated by the first view that starts it
+        :param stream: ArrivalStream or TraceStream
+        """
+        self.stream = stream
+        self.day = None  # day index of the arrivals
+        self.arrivals = []  # (arrival time, source floor, destination floor) of the day
+
+    def __repr__(self):
+        return "SharedArrivals: day {}, {} arrivals".format(self.day, len(self.arrivals))
+
+    def load(self, rng, day):
+        """
+        :param rng: numpy Generator of the arrivals stream, used only by the first view of the day
+        :param day: day index
+        :return: list of the day's arrivals
+        """
+        if day != self.day:
+            self.stream.generate(rng, day)
+            self.arrivals = list(iter(self.stream.next_arrival, None))
+            self.day = day
+        return self.arrivals
+
+    def view(self):
+        return ArrivalView(self)
+
+
+class ArrivalView:
+    def __init__(self, shared):
+        """
+        arrival stream of a single simulation over SharedArrivals
+        :param shared: SharedArrivals object
+        """
+        self.shared = shared
+        self._arrivals = []
+        self.index = 0
+
+    def __len__(self):
+        return len(self._arrivals)
+
+    def generate(self, rng, day=0):
+        """
+        :param rng: numpy Generator of the arrivals stream
+        :param day: day index
+        :return: None
+        """
+        self._arrivals = self.shared.load(rng, day)
+        self.index = 0
+
+    def next_arrival(self):
+        """
+        read the next arrival of the day
+        :return: tuple of (arrival time, source floor, destination floor), None if the day has no more arrivals
+        """
+        if self.index >= len(self._arrivals):
+            return None
+        arrival = self._arrivals[self.index]
+        self.index += 1
+        return arrival
+
+    def describe(self):
+        return self.shared.stream.describe()
@@ -0,0 +1,331 @@
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+import numpy as np
+from Floor import Floor
+from Elevator import Elevator
+from Client import Client
+from Simulation import Simulation
+from Streams import RandomStreams
+from Building import Building
+from Dispatchers import SuggestedDispatcher, ZoneDispatcher
+
+LINE_LENGTHS = (10, 100, 1000)  # clients waiting in the floor of the boarding benchmarks
+TOWERS = ((26, 4), (60, 24), (240, 96))  # (floors, elevators) of the dispatch scaling benchmarks
+
+
+def random_clients(rng, floor, count, time=21600):
+    """
+    :param rng: numpy Generator
+    :param floor: floor the clients wait at
+    :param count: number of clients
+    :param time: arrival time of the first client
+    :return: list of Client objects arriving a second apart, to random desired floors
+    """
+    desired = rng.choice([f for f in range(26) if f != floor], size=count)
+    return [Client(floor, int(desired_floor), time + i) for i, desired_floor in enumerate(desired)]
+
+
+def bench_board(length):
+    """
+    board a Suggested elevator going up at floor 0, from a line of length clients
+    :return: function running the benchmark, returning the number of operations
+    """
+    def run():
+        rng = np.random.default_rng(length)
+        rounds = min(5000, 200000 // length)
+        floors, elevators = [], []
+        for _ in range(rounds):  # the line is rebuilt for every boarding, outside the timing
+            floor = Floor(0)
+            for client in random_clients(rng, 0, length):
+                floor.add_to_line(client)
+            floors.append(floor)
+            elevators.append(Elevator(1, False))
+        start = time.perf_counter()
+        for floor, elevator in zip(floors, elevators):
+            floor.board_clients(elevator, 30000)
+        return rounds, time.perf_counter() - start
+    return run
+
+
+def bench_drop(length):
+    """
+    drop clients from full elevators at floor 0, length clients waiting in the lobby line
+    the riders get off at the lobby or swap to the other zone's elevators, joining the line
+    :return: function running the benchmark, returning the number of operations
+    """
+    def run():
+        rng = np.random.default_rng(length)
+        rounds = min(2000, 200000 // length)
+        floors, elevators = [], []
+        for _ in range(rounds):
+            floor = Floor(0)
+            for client in random_clients(rng, 0, length):
+                floor.add_to_line(client)
+            elevator = Elevator(1, False)
+            elevator.floor = 0
+            riders = [Client(int(source), int(desired_floor), 21600) for source, desired_floor in
+                      zip(rng.integers(1, 16, size=elevator.capacity), rng.choice([0] + list(range(16, 26)),
+                                                                                  size=elevator.capacity))]
+            elevator.board_clients(riders)
+            floors.append(floor)
+            elevators.append(elevator)
+        start = time.perf_counter()
+        for floor, elevator in zip(floors, elevators):
+            floor.drop_clients(elevator, 30000)
+        return rounds, time.perf_counter() - start
+    return run
+
+
+def bench_order_elevator():
+    """
+    hall call presses of random clients, in a Suggested simulation with elevators spread over the building
+    :return: function running the benchmark, returning the number of operations
+    """
+    def run():
+        rng = np.random.default_rng(0)
+        sim = Simulation(False)
+        for elevator, floor in zip(sim.elevators, (3, 12, 18, 24)):
+            elevator.floor = floor
+            elevator.start = True
+        presses = []
+        for _ in range(100000):
+            floor, desired_floor = (int(f) for f in rng.choice(26, size=2, replace=False))
+            if sim.building.need_swap(floor, desired_floor):  # pressed like Simulation.arriving does
+                presses.append((floor, "down", 0))
+            else:
+                presses.append((floor, "up" if desired_floor > floor else "down", desired_floor))
+        start = time.perf_counter()
+        for i, (floor, direction, desired_floor) in enumerate(presses):
+            sim.dispatcher.order_elevator(sim, floor, direction, desired_floor)
+            if i % 16 == 15:  # elevators served their calls, the buttons are pressed again
+                for elevator in range(len(sim.elevators)):
+                    sim.hall_calls.release(elevator)
+        return len(presses), time.perf_counter() - start
+    return run
+
+
+def tower(floors, elevators, per_zone=6):
+    """
+    a building of zones of equal height, served by per_zone elevators each, with arrivals from and to the lobby
+    :param floors: number of floors, including the lobby
+    :param elevators: number of elevators, a multiple of per_zone or less than it
+    :param per_zone: elevators of every zone
+    :return: Building object
+    """
+    per_zone = min(per_zone, elevators)
+    count = elevators // per_zone
+    bounds = np.linspace(1, floors, count + 1).astype(int)
+    zones = [(int(low), int(high) - 1) for low, high in zip(bounds[:-1], bounds[1:])]
+    return Building(floors=floors, zones=zones, elevators=[per_zone] * count,
+                    start_floors=[low for low, _ in zones for _ in range(per_zone)],
+                    periods=[(21600, 72000, [300, 300])], sources=[(0, 1), (1, floors)],
+                    destinations=[(1, floors), (0, 1)])
+
+
+def bench_dispatch(dispatcher, floors, elevators):
+    """
+    choose the elevator of hall calls, in a building of floors and elevators with busy elevators spread over it
+    :param dispatcher: SuggestedDispatcher or ZoneDispatcher class
+    :return: function running the benchmark, returning the number of operations
+    """
+    def run():
+        rng = np.random.default_rng(0)
+        sim = Simulation(False, building=tower(floors, elevators), dispatcher=dispatcher())
+        sim.start_day(0)
+        for elevator in sim.elevators:
+            zone = sorted(elevator.service_floors - {0})
+            elevator.floor = int(rng.choice(zone))
+            elevator.up = bool(rng.integers(2))
+            elevator.up_set.add(int(rng.choice(zone)))
+            elevator.down_set.add(int(rng.choice(zone)))
+        sim.dispatcher.start_day(sim)  # index the placed elevators
+        calls = []
+        for _ in range(20000):
+            zone = sorted(sim.elevators[int(rng.integers(elevators))].service_floors)
+            floor, desired_floor = (int(f) for f in rng.choice(zone, size=2, replace=False))
+            calls.append((floor, desired_floor))
+        closest_elevator = sim.dispatcher.closest_elevator
+        start = time.perf_counter()
+        for floor, desired_floor in calls:
+            closest_elevator(sim, floor, desired_floor)
+        return len(calls), time.perf_counter() - start
+    return run
+
+
+def bench_tower_day(dispatcher, floors, elevators):
+    """
+    a full Suggested day in a building of floors and elevators, including the dispatcher's bookkeeping
+    :param dispatcher: SuggestedDispatcher or ZoneDispatcher class
+    :return: function running the benchmark, returning the number of operations, events
+    """
+    def run():
+        sim = Simulation(False, building=tower(floors, elevators), dispatcher=dispatcher())
+        start = time.perf_counter()
+        sim.run_day(0)
+        return sim.events.seq, time.perf_counter() - start
+    return run
+
+
+def bench_travel():
+    """
+    Suggested elevators travelling through random queues
+    :return: function running the benchmark, returning the number of operations
+    """
+    def run():
+        rng = np.random.default_rng(0)
+        streams = RandomStreams(0)
+        elevators = []
+        for i in range(10000):
+            elevator = Elevator(i % 4 + 1, False, streams)
+            floors = sorted(elevator.service_floors)
+            for floor in rng.choice(floors, size=6):
+                elevator.add_to_queue([int(floor), 0], "up" if floor > elevator.floor else "down")
+            elevators.append(elevator)
+        moves = 0
+        start = time.perf_counter()
+        for elevator in elevators:
+            for _ in range(8):
+                elevator.travel()
+            moves += 8
+        return moves, time.perf_counter() - start
+    return run
+
+
+def bench_gen_client():
+    """
+    read 5 days of arrivals
+    :return: function running the benchmark, returning the number of operations
+    """
+    def run():
+        sim = Simulation(False)
+        clients = 0
+        seconds = 0
+        for day in range(5):
+            sim.arrivals.generate(RandomStreams(day).arrivals)
+            start = time.perf_counter()
+            while sim.gen_client() is not None:
+                clients += 1
+            seconds += time.perf_counter() - start
+        return clients, seconds
+    return run
+
+
+def bench_day(saturday):
+    """
+    a full simulated day, operations are events
+    :return: function running the benchmark, returning the number of operations
+    """
+    def run():
+        sim = Simulation(saturday)
+        start = time.perf_counter()
+        sim.run_day(0)
+        return sim.events.seq, time.perf_counter() - start
+    return run
+
+
+# benchmark name -> (function creating the benchmark, unit of the operations)
+BENCHMARKS = {}
+for length in LINE_LENGTHS:
+    BENCHMARKS["board_clients_{}".format(length)] = (lambda length=length: bench_board(length), "calls")
+    BENCHMARKS["drop_clients_{}".format(length)] = (lambda length=length: bench_drop(length), "calls")
+BENCHMARKS["order_elevator"] = (bench_order_elevator, "presses")
+for floors, elevators in TOWERS:
+    for dispatcher in (SuggestedDispatcher, ZoneDispatcher):
+        BENCHMARKS["dispatch_{}_{}x{}".format(dispatcher.name, floors, elevators)] = (
+            lambda dispatcher=dispatcher, floors=floors, elevators=elevators:
+            bench_dispatch(dispatcher, floors, elevators), "calls")
+        BENCHMARKS["tower_{}_{}x{}_day".format(dispatcher.name, floors, elevators)] = (
+            lambda dispatcher=dispatcher, floors=floors, elevators=elevators:
+            bench_tower_day(dispatcher, floors, elevators), "events")
+BENCHMARKS["travel"] = (bench_travel, "moves")
+BENCHMARKS["gen_client"] = (bench_gen_client, "clients")
+BENCHMARKS["saturday_day"] = (lambda: bench_day(True), "events")
+BENCHMARKS["suggested_day"] = (lambda: bench_day(False), "events")
+
+
+def measure(name, repeat=5):
+    """
+    run a benchmark repeat times, the fastest run is kept
+    :param name: key of BENCHMARKS
+    :param repeat: number of runs
+    :return: dictionary of operations per second, seconds of the fastest run and peak traced memory in KiB
+    """
+    make, _ = BENCHMARKS[name]
+    run = make()
+    best = None
+    for _ in range(repeat):
+        ops, seconds = run()
+        if best is None or seconds < best[1]:
+            best = ops, seconds
+    tracemalloc.start()  # a separate run, tracing slows it down
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    ops, seconds = best
+    return {"ops_per_second": ops / seconds, "seconds": seconds, "peak_kib": peak / 1024}
+
+
+def compare(results, baselines, threshold):
+    """
+    :param results: dictionary of benchmark name to measure result
+    :param baselines: dictionary of benchmark name to a baseline measure result
+    :param threshold: allowed relative slowdown, e.g. 0.2
+    :return: list of names of benchmarks slower than their baseline by more than threshold
+    """
+    return [name for name, result in results.items() if name in baselines
+            and result["ops_per_second"] < baselines[name]["ops_per_second"] * (1 - threshold)]
+
+
+def main(argv=None):
+    """
+    command line entry point, e.g. python Benchmark.py --save, then python Benchmark.py after a change
+    :param argv: command line arguments
+    :return: exit code, 1 if a benchmark regressed
+    """
+    parser = argparse.ArgumentParser(description="Elevators simulation benchmarks")
+    parser.add_argument("names", nargs="*", help="benchmarks to run, default is all: {}".format(", ".join(BENCHMARKS)))
+    parser.add_argument("--repeat", type=int, default=5, help="runs of every benchmark, the fastest is kept")
+    parser.add_argument("--baselines", default="benchmarks.json", help="json file of the baselines")
+    parser.add_argument("--save", action="store_true", help="store the results as the new baselines")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="fail if a benchmark is slower than its baseline by more than this fraction")
+    args = parser.parse_args(argv)
+
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error("unknown benchmark {}".format(name))
+    try:
+        with open(args.baselines) as f:
+            baselines = json.load(f)
+    except OSError:
+        baselines = {}
+
+    results = {}
+    for name in args.names or BENCHMARKS:
+        result = results[name] = measure(name, args.repeat)
+        line = "{:<28}{:>14.0f} {}/s {:>10.4f}s {:>10.0f} KiB".format(
+            name, result["ops_per_second"], BENCHMARKS[name][1], result["seconds"], result["peak_kib"])
+        if name.endswith("_day"):
+            line += " {:>8.1f} days/min".format(60 / result["seconds"])
+        if name in baselines:
+            line += " {:>+7.1%} vs baseline".format(result["ops_per_second"] / baselines[name]["ops_per_second"] - 1)
+        print(line)
+
+    if args.save:
+        baselines.update(results)
+        with open(args.baselines, "w") as f:
+            json.dump(baselines, f, indent=2)
+        print("Baselines saved to {}".format(args.baselines))
+        return 0
+    regressed = compare(results, baselines, args.threshold)
+    if regressed:
+        print("Regressed more than {:.0%}: {}".format(args.threshold, ", ".join(regressed)))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
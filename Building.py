@@ -0,0 +1,134 @@
+import json
+from Arrivals import PERIODS, SOURCES, DESTINATIONS
+from Metrics import SERVICE_EDGES, OPEN_BUCKET
+
+
+class Building:
+    def __init__(self, floors=26, zones=((1, 15), (16, 25)), elevators=(2, 2), capacity=15, patience=15 * 60,
+                 start_floors=(2, 10, 17, 20), periods=PERIODS, sources=SOURCES, destinations=DESTINATIONS,
+                 service_edges=SERVICE_EDGES):
+        """
+        building and scenario configuration, floor 0 is the lobby and is served by all elevators
+        :param floors: number of floors, including the lobby
+        :param zones: (lowest, highest) floor of every zone
+        :param elevators: number of elevators serving every zone, elevators are numbered zone by zone
+        :param capacity: maximal number of clients in an elevator
+        :param patience: seconds a client waits before abandoning
+        :param start_floors: floor of every elevator at the start of a Saturday day
+        :param periods: (start, end, arrival rates per hour of every table row) of every time of day
+        :param sources: (low, high) source floor range of every table row
+        :param destinations: (low, high) destination floor range of every table row
+        :param service_edges: increasing upper edges in seconds of the service time buckets, the last bucket holds
+        the longer service times
+        """
+        self.floors = floors
+        self.zones = [tuple(zone) for zone in zones]
+        self.elevators = list(elevators)
+        self.capacity = capacity
+        self.patience = patience
+        self.start_floors = list(start_floors)
+        self.periods = [(start, end, list(rates)) for start, end, rates in periods]
+        self.sources = [tuple(rng) for rng in sources]
+        self.destinations = [tuple(rng) for rng in destinations]
+        self.service_edges = tuple(service_edges)
+        self.validate()
+        # service floors of every elevator
+        self.service_floors = []
+        for (low, high), count in zip(self.zones, self.elevators):
+            self.service_floors += [set(range(low, high + 1)) | {0} for _ in range(count)]
+        self.top = floors - 1  # top floor of the building
+
+    def __repr__(self):
+        return "Building: {} floors, zones {}, elevators {}, capacity {}".format(
+            self.floors, self.zones, self.elevators, self.capacity)
+
+    def __eq__(self, other):
+        return isinstance(other, Building) and self.to_dict() == other.to_dict()
+
+    def validate(self):
+        """
+        raise ValueError if the configuration is inconsistent
+        :return: None
+        """
+        if len(self.zones) != len(self.elevators):
+            raise ValueError("Every zone needs a number of elevators")
+        for low, high in self.zones:
+            if not 1 <= low <= high < self.floors:
+                raise ValueError("Zone {} is out of the building's floors".format((low, high)))
+        if len(self.start_floors) != sum(self.elevators):
+            raise ValueError("Every elevator needs a start floor")
+        rows = len(self.sources)
+        if len(self.destinations) != rows or any(len(rates) != rows for _, _, rates in self.periods):
+            raise ValueError("Arrival tables must have the same number of rows")
+        served = {0}.union(*(range(low, high + 1) for low, high in self.zones))  # the lobby and the zones' floors
+        for low, high in self.sources + self.destinations:
+            if not 0 <= low < high <= self.floors:
+                raise ValueError("Floor range {} is out of the building's floors".format((low, high)))
+            unserved = sorted(set(range(low, high)) - served)
+            if unserved:  # clients would wait there for an elevator that never comes
+                raise ValueError("Floors {} of floor range {} are not served by any zone".format(
+                    unserved, (low, high)))
+        edges = self.service_edges
+        if not edges or edges[0] <= 0 or any(low >= high for low, high in zip(edges, edges[1:])):
+            raise ValueError("Service time edges {} must be positive and increasing".format(list(edges)))
+        if edges[-1] >= OPEN_BUCKET:
+            raise ValueError("Service time edges must be below {}, the key of the open bucket".format(OPEN_BUCKET))
+
+    def need_swap(self, current_floor, desired_floor):
+        """
+        client needs a swap at the lobby if no elevator serves both floors
+        :return: boolean
+        """
+        return not any(current_floor in floors and desired_floor in floors for floors in self.service_floors)
+
+    def to_dict(self):
+        return {
+            "floors": self.floors,
+            "zones": [list(zone) for zone in self.zones],
+            "elevators": self.elevators,
+            "capacity": self.capacity,
+            "patience": self.patience,
+            "start_floors": self.start_floors,
+            "periods": [[start, end, rates] for start, end, rates in self.periods],
+            "sources": [list(rng) for rng in self.sources],
+            "destinations": [list(rng) for rng in self.destinations],
+            "service_edges": list(self.service_edges),
+        }
+
+    def replace(self, **changes):
+        """
+        :param changes: configuration values to change
+        :return: new Building object
+        """
+        config = self.to_dict()
+        config.update(changes)
+        return Building(**config)
+
+    @staticmethod
+    def from_file(path):
+        """
+        load a building from a json file, missing values take the default building's values
+        :param path: json file path
+        :return: Building object
+        """
+        with open(path) as f:
+            return Building(**json.load(f))
+
+
+if __name__ == "__main__":
+    # inconsistent configurations are rejected
+    building = Building()
+    for changes in ({"elevators": [2]},  # a zone without elevators
+                    {"start_floors": [2, 10]},  # elevators without a start floor
+                    {"zones": [[1, 15], [17, 25]]},  # clients arrive at and go to floor 16, no zone serves it
+                    {"floors": 30, "sources": SOURCES[:5] + [[16, 30]] * 3},  # floors 26-29 have arrivals
+                    {"service_edges": []}, {"service_edges": [120, 60]}, {"service_edges": [0, 60]},
+                    {"service_edges": [60, 1200]}):  # 1000 is the key of the open bucket
+        try:
+            building.replace(**changes)
+        except ValueError:
+            continue
+        raise AssertionError("{} was not rejected".format(changes))
+    building.replace(floors=30)  # floors without arrivals need no zone
+    building.replace(service_edges=[30, 90.5, 600])
+    print("Inconsistent buildings are rejected")
@@ -0,0 +1,128 @@
+import os
+import glob
+import json
+import hashlib
+
+_code_version = None
+
+
+def code_version():
+    """
+    hash of the simulator's source files, any code change invalidates the cached results
+    :return: hex string
+    """
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256()
+        for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))):
+            with open(path, "rb") as f:
+                digest.update(os.path.basename(path).encode() + b"\0" + f.read())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+
+class ResultCache:
+    def __init__(self, path=".cache", max_bytes=256 * 2 ** 20):
+        """
+        persistent cache of day results (tuples returned by Simulation.run_day), a json file per result
+        the least recently used results are evicted when the cache is larger than max_bytes
+        :param path: cache directory
+        :param max_bytes: maximal size of the cache
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(path, exist_ok=True)
+        self.size = sum(os.path.getsize(entry) for entry in self.entries())
+
+    def __repr__(self):
+        return "ResultCache: {}, {} bytes, {} hits, {} misses".format(self.path, self.size, self.hits, self.misses)
+
+    def entries(self):
+        return glob.glob(os.path.join(self.path, "*", "*.json"))
+
+    @staticmethod
+    def key(saturday, building, seed, arrivals=None, dispatcher=None):
+        """
+        stable key of a simulated day
+        :param saturday: boolean, Saturday/Suggested mode
+        :param building: Building object
+        :param seed: seed of the day
+        :param arrivals: json description of recorded arrivals, None for random arrivals
+        :param dispatcher: name of the elevators' Dispatcher
+        :return: hex string
+        """
+        scenario = {"saturday": saturday, "building": building.to_dict(), "seed": seed, "version": code_version()}
+        if arrivals is not None:
+            scenario["arrivals"] = arrivals
+        if dispatcher is not None:
+            scenario["dispatcher"] = dispatcher
+        scenario = json.dumps(scenario, sort_keys=True)
+        return hashlib.sha256(scenario.encode()).hexdigest()
+
+    def file(self, key):
+        return os.path.join(self.path, key[:2], key + ".json")
+
+    def get(self, key):
+        """
+        :param key: key returned by ResultCache.key
+        :return: day result, None if it is not cached
+        """
+        path = self.file(key)
+        try:
+            with open(path) as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        os.utime(path)  # mark as recently used
+        self.hits += 1
+        return tuple(tuple(value) if isinstance(value, list) else value for value in result)
+
+    def put(self, key, result):
+        """
+        store a day result, evict old results if the cache is full
+        :param key: key returned by ResultCache.key
+        :param result: day result
+        :return: None
+        """
+        path = self.file(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(result, f)
+        if os.path.exists(path):
+            self.size -= os.path.getsize(path)
+        os.replace(tmp, path)  # atomic, other processes never read a partial file
+        self.size += os.path.getsize(path)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """
+        delete least recently used results until the cache is at 90% of its maximal size
+        :return: None
+        """
+        entries = []
+        for entry in self.entries():
+            try:
+                stat = os.stat(entry)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        entries.sort()
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if self.size <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(entry)
+            except OSError:
+                continue
+            self.size -= size
+
+    def clear(self):
+        for entry in self.entries():
+            os.remove(entry)
+        self.size = 0
@@ -1,15 +1,26 @@
+from Building import Building
+
+DEFAULT_BUILDING = Building()
+
+
 class Client:
-    def __init__(self, current_floor, desired_floor, arrival_time):
+    # a day creates tens of thousands of clients, slots keep them small and their attributes fixed
+    __slots__ = ("arrival_time", "desired_floor", "time_in_sys", "floor_time", "travelling", "current_floor",
+                 "source_floor", "board_time", "direction", "got_service", "reorder", "need_swap")
+
+    def __init__(self, current_floor, desired_floor, arrival_time, building=DEFAULT_BUILDING):
         self.arrival_time = arrival_time
         self.desired_floor = desired_floor
         self.time_in_sys = 0  # client's overall time in the system
         self.floor_time = 0  # client's floor time
         self.travelling = False  # set flag if client is moving the elevator
         self.current_floor = current_floor  # client's current floor
+        self.source_floor = current_floor  # floor the client arrived at
+        self.board_time = None  # time the client first boarded an elevator
         self.direction = None  # direction the client wants to go up/down
         self.got_service = False  # flag to track if client ever boarded an elevator
         self.reorder = False # if client switched elevator, value will be true
-        if (1 <= current_floor <= 15 and desired_floor >= 16) or (current_floor >= 16 and desired_floor <= 15 and desired_floor != 0):
+        if building.need_swap(current_floor, desired_floor):  # no elevator serves both floors
             self.need_swap = True  # use for ordering elevators in Simulation
         else:
             self.need_swap = False  # use for ordering elevators in Simulation (will order it to go to 0)
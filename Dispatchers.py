@@ -0,0 +1,337 @@
+import math
+from Event import ARRIVING, DOOR_OPEN, DOOR_CLOSE
+from Timetable import floor_zones, saturday_day
+
+
+class Dispatcher:
+    name = None  # name of the strategy in the results
+    saturday = False  # elevators start spread over the building like Saturday elevators (Building.start_floors)
+
+    def __repr__(self):
+        return "Dispatcher: {}".format(self.name)
+
+    def start_day(self, sim):
+        """
+        called after the day's first arrival was pushed
+        :param sim: Simulation object
+        :return: None
+        """
+
+    def run_day(self, sim):
+        """
+        fast path of Simulation.run_day, simulate the whole day without events
+        :param sim: Simulation object, after start_day
+        :return: True if the day was simulated, False to handle its events
+        """
+        return False
+
+    def on_hall_call(self, sim, floor, client):
+        """
+        a client joined the line of a floor, on arrival or when he got off at the lobby to swap
+        :param sim: Simulation object
+        :param floor: floor number
+        :param client: Client object
+        :return: None
+        """
+
+    def on_car_call(self, sim, elevator, clients):
+        """
+        clients boarded an elevator, before its doors close
+        :param sim: Simulation object
+        :param elevator: Elevator object
+        :param clients: list of the boarding Client objects
+        :return: None
+        """
+
+    def on_stop(self, sim, floor, elevator):
+        """
+        an elevator opened its doors and its riders got off
+        :param sim: Simulation object
+        :param floor: floor number
+        :param elevator: Elevator object
+        :return: None
+        """
+
+    def on_breakdown(self, sim, elevator):
+        """
+        an elevator got stuck at its stop
+        :param sim: Simulation object
+        :param elevator: Elevator object
+        :return: None
+        """
+
+    def on_fix(self, sim, elevator):
+        """
+        a stuck elevator was fixed, its doors open next
+        :param sim: Simulation object
+        :param elevator: Elevator object
+        :return: None
+        """
+
+    def next_stop(self, sim, elevator):
+        """
+        the doors of an elevator closed, move it and push the door open event of its next stop
+        :param sim: Simulation object
+        :param elevator: Elevator object
+        :return: None
+        """
+        raise NotImplementedError
+
+    def on_idle(self, sim, elevator):
+        """
+        an elevator has nothing to do, by default it is parked at the lobby until it is called
+        :param sim: Simulation object
+        :param elevator: Elevator object
+        :return: None
+        """
+        sim.park_elevator(elevator)
+
+
+class SaturdayDispatcher(Dispatcher):
+    """
+    the Saturday elevators ride a fixed cycle through their zone and open at every floor on the way
+    """
+    name = "saturday"
+    saturday = True
+
+    def start_day(self, sim):
+        for elevator in sim.elevators:  # push door open event for all elevators
+            sim.events.push(sim.curr_time, DOOR_OPEN, elevator.floor, elevator.number)
+
+    def next_stop(self, sim, elevator):
+        travel_time = elevator.travel()  # moves the elevator to the next floor of its cycle
+        sim.events.push(sim.curr_time + travel_time, DOOR_OPEN, elevator.floor, elevator.number)
+
+
+class TimetableDispatcher(SaturdayDispatcher):
+    """
+    the Saturday strategy, whole days are simulated from the elevators' timetables (Timetable.saturday_day),
+    the results are statistically the same as SaturdayDispatcher's, not event by event the same
+    days that are stopped and continued (run_until, checkpoints), recorded or profiled are simulated with events
+    """
+    name = "timetable"
+
+    def run_day(self, sim):
+        if floor_zones(sim.building) is None:  # elevators of different zones share floors
+            return False
+        arrivals = []
+        events = sim.events
+        while events:  # the first arrival and the elevators' door open events
+            _, _, kind, _, _, client = events.pop()
+            if kind == ARRIVING:
+                arrivals.append((client.arrival_time, client.current_floor, client.desired_floor))
+        arrivals += iter(sim.arrivals.next_arrival, None)
+        return saturday_day(sim, arrivals)
+
+
+class SuggestedDispatcher(Dispatcher):
+    """
+    the Suggested elevators are called by hall call buttons, the closest elevator of the zone takes a call,
+    and idle elevators park at the lobby
+    """
+    name = "suggested"
+
+    def on_hall_call(self, sim, floor, client):
+        if client.got_service:  # got off at the lobby to swap, orders an elevator of the other zone once
+            if not client.reorder:
+                self.order_elevator(sim, 0, "up", client.desired_floor)
+                client.reorder = True
+            return
+        # search for elevator in this floor
+        for elevator in sim.elevators:
+            # there is an Elevator in the desired floor with closed doors, open doors
+            if not elevator.start:
+                if elevator.floor == floor and not elevator.doors_open and client.desired_floor in elevator.service_floors:
+                    sim.wake_elevator(elevator, DOOR_OPEN)  # elevator won't open while moving
+                    break  # open just one Elevator
+        if client.need_swap:  # add current and target floors to queue
+            self.order_elevator(sim, floor, "down", 0)
+        else:  # client doesn't need swap
+            direction = None  # if client arrived to a floor with an open elevator, do nothing
+            if client.current_floor > client.desired_floor:
+                direction = "down"
+            elif client.current_floor < client.desired_floor:
+                direction = "up"
+            self.order_elevator(sim, floor, direction, client.desired_floor)
+
+    def on_car_call(self, sim, elevator, clients):
+        for client in clients:  # press the desired floor's button, clients who need a swap go to the lobby
+            if elevator.up:
+                elevator.up_set.add(client.desired_floor)
+            else:
+                if client.desired_floor not in elevator.service_floors:
+                    elevator.down_set.add(0)
+                else:
+                    elevator.down_set.add(client.desired_floor)
+
+    def on_stop(self, sim, floor, elevator):
+        sim.hall_calls.serve(floor, elevator.number - 1)  # turn off the floor's buttons
+
+    def on_breakdown(self, sim, elevator):
+        for key, desired_floor in sim.hall_calls.release(elevator.number - 1):  # pass the calls to other elevators
+            self.dispatch(sim, key, desired_floor)
+
+    def next_stop(self, sim, elevator):
+        if elevator.idle() and not sim.has_waiting_clients(elevator):
+            self.on_idle(sim, elevator)  # no events until the elevator is called
+            return
+        queued = elevator.queued() if sim.hall_calls.by_elevator[elevator.number - 1] else 0
+        travel_time = elevator.travel()  # pops floor from queue and moves the elevator to next floor
+        # elevator.floor is the new floor the elevator reached
+        sim.events.push(sim.curr_time + travel_time, DOOR_OPEN, elevator.floor, elevator.number)
+        # travel drops queued floors when it reloads its queues, their calls would stay lit and never be served
+        dropped = queued & ~elevator.queued() & ~(1 << elevator.floor) if queued else 0
+        if dropped:
+            self.requeue(sim, elevator, dropped)
+
+    def requeue(self, sim, elevator, floors):
+        """
+        dispatch again the calls of floors that left an elevator's queues without a stop
+        :param sim: Simulation object
+        :param elevator: Elevator object, after it moved
+        :param floors: bitmask of the dropped floors
+        :return: None
+        """
+        for key, desired_floor in sim.hall_calls.release(elevator.number - 1, floors):
+            self.dispatch(sim, key, desired_floor)
+
+    def order_elevator(self, sim, floor, direction, desired_floor):
+        """
+        press the hall call button, if it is already lit the call has an elevator and nothing is done
+        :param sim: Simulation object
+        :param floor: floor the client wants to go from
+        :param desired_floor: floor the client wants to go to
+        :param direction: "up" or "down"
+        :return: None
+        """
+        hall_calls = sim.hall_calls
+        hall_calls.presses += 1
+        key = hall_calls.key(floor, direction, desired_floor)
+        if hall_calls.assigned(key) is None:
+            self.dispatch(sim, key, desired_floor)
+
+    def dispatch(self, sim, key, desired_floor):
+        """
+        assign a hall call to the closest elevator
+        the call is registered only if the elevator queued it, otherwise the next press tries again
+        :param sim: Simulation object
+        :param key: call key (floor, direction, group)
+        :param desired_floor: floor the client wants to go to
+        :return: index of the chosen elevator
+        """
+        floor, direction, _ = key
+        sim.hall_calls.dispatches += 1
+        candidate_elevator = self.closest_elevator(sim, floor, desired_floor)
+        elevator = sim.elevators[candidate_elevator]
+        if elevator.add_to_queue([floor, desired_floor], direction):
+            sim.hall_calls.assign(key, candidate_elevator, desired_floor)
+        if not elevator.start:  # parked, open it for the call or send it on its way
+            sim.wake_elevator(elevator, DOOR_OPEN if elevator.floor == floor else DOOR_CLOSE)
+        return candidate_elevator
+
+    def closest_elevator(self, sim, floor, desired_floor):
+        """
+        find closest elevator
+        :param sim: Simulation object
+        :param floor: floor the client wants to go from
+        :param desired_floor: floor the client wants to go to
+        :return: elevator index
+        """
+        # if swap is needed, desired floor will be 0
+        # score elevators according to their distance from floor given
+        # if elevator is going the opposite direction,
+        # just add the number of floors it has left to the top and add top - desired
+        # avoid ordering if elevator present in floor
+        closest = 999
+        top = sim.building.top
+        # set default elevator to be ordered, the first elevator of the zone serving both floors
+        for candidate_elevator, floors in enumerate(sim.building.service_floors):
+            if floor in floors and desired_floor in floors:
+                break
+        else:
+            raise ValueError("No elevator serves floors {} and {}".format(floor, desired_floor))
+        for elevator in sim.elevators:
+            # elevator not stuck and must be able to reach from client's floor to desired floor
+            # desired floor will be 0 if client wants a swap
+            # if one of the conditions is true, don't order that elevator!
+            if elevator.is_stuck or (
+                    floor not in elevator.service_floors or desired_floor not in elevator.service_floors):  # can't order that elevator
+                continue
+            score = 999
+            if not elevator.up_set.mask or not elevator.down_set.mask:
+                candidate_elevator = elevator.number - 1
+                break
+            if elevator.up:  # elevator moving up
+                if elevator.floor < floor:  # client is above elevator
+                    score = floor - elevator.floor
+                elif elevator.floor > floor:  # elevator passed the floor
+                    score = (top - elevator.floor) + (
+                            top - floor)  # first is distance to top, second is from top to request
+            else:  # elevator going down
+                if elevator.floor > floor:  # client is below elevator
+                    score = elevator.floor - floor
+                elif elevator.floor < floor:  # elevator passed the floor
+                    score = elevator.floor + floor  # first is distance to bottom, second is from bottom to request
+            if score < closest and score != 0:  # don't order an elevator that is in that floor
+                closest = score
+                candidate_elevator = elevator.number - 1
+        return candidate_elevator
+
+
+class ZoneDispatcher(SuggestedDispatcher):
+    """
+    the Suggested strategy for large buildings, a call only scores the elevators serving both its floors (its group,
+    see HallCallRegistry.group), the elevators of a zone, instead of every elevator of the building
+    it chooses the elevators SuggestedDispatcher chooses, except that far elevators of very tall buildings
+    (scores of 999 floors and more) are not ignored
+    the zone is scanned linearly, the cost of a call is the number of elevators of its zone, not O(log elevators)
+    """
+    name = "zone"
+
+    def closest_elevator(self, sim, floor, desired_floor):
+        """
+        find closest elevator, with the scores of SuggestedDispatcher.closest_elevator
+        :param sim: Simulation object
+        :param floor: floor the client wants to go from
+        :param desired_floor: floor the client wants to go to
+        :return: elevator index
+        """
+        group = sim.hall_calls.group(floor, desired_floor)
+        if not group:
+            raise ValueError("No elevator serves floors {} and {}".format(floor, desired_floor))
+        elevators = sim.elevators
+        top = sim.building.top
+        closest = math.inf
+        candidate_elevator = group[0]  # the first elevator of the group by default
+        for i in group:
+            elevator = elevators[i]
+            if elevator.is_stuck:
+                continue
+            if not elevator.up_set.mask or not elevator.down_set.mask:  # the first elevator with an empty queue
+                return i
+            if elevator.up:  # elevator moving up
+                if elevator.floor < floor:  # client is above elevator
+                    score = floor - elevator.floor
+                elif elevator.floor > floor:  # elevator passed the floor
+                    score = (top - elevator.floor) + (top - floor)
+                else:  # don't order an elevator that is in that floor
+                    continue
+            else:  # elevator going down
+                if elevator.floor > floor:  # client is below elevator
+                    score = elevator.floor - floor
+                elif elevator.floor < floor:  # elevator passed the floor
+                    score = elevator.floor + floor
+                else:
+                    continue
+            if score < closest:
+                closest = score
+                candidate_elevator = i
+        return candidate_elevator
+
+
+def default_dispatcher(saturday):
+    """
+    :param saturday: boolean, Saturday/Suggested mode
+    :return: built-in Dispatcher of the mode
+    """
+    return SaturdayDispatcher() if saturday else SuggestedDispatcher()
@@ -1,41 +1,63 @@
-import numpy as np
+from Streams import RandomStreams
+from Building import Building
+from FloorSet import FloorSet
 
 
 class Elevator:
-    def __init__(self, number, saturday):
+    __slots__ = ("number", "streams", "is_stuck", "riders", "transfers", "load", "saturday", "up_set", "down_set", "orders_up",
+                 "orders_down", "doors_open", "up", "start", "prv_open_time", "breakdown", "floor",
+                 "service_floors", "capacity", "top", "low")
+
+    def __init__(self, number, saturday, streams=None, building=None):
         self.number = number # number of the elevator
+        self.streams = streams if streams is not None else RandomStreams()  # breakdown and repair random streams
+        building = building if building is not None else Building()
         self.is_stuck = False # flag that indicates if the elevator is stuck
-        self.clients = []  # client in elevator
+        # clients in the elevator, indexed by the floor they get off at, so a stop only touches them
+        self.riders = {}  # desired floor -> clients going there, in boarding order, floors without clients are deleted
+        self.transfers = []  # clients going to another zone in boarding order, they get off at the lobby to swap
+        self.load = 0  # number of clients in the elevator
         self.saturday = saturday  # defines saturday elevator behaviour
-        self.up_set = set()  # current queue
-        self.down_set = set()  # current queue
-        self.orders_up = set()  # will hold orders for next round
-        self.orders_down = set()  # will hold orders for next round
+        self.up_set = FloorSet()  # current queue
+        self.down_set = FloorSet()  # current queue
+        self.orders_up = FloorSet()  # will hold orders for next round
+        self.orders_down = FloorSet()  # will hold orders for next round
         self.doors_open = False
         self.up = True  # direction of the elevator
-        self.start = False  # flag if elevator was called yet or not
+        self.start = False  # flag if elevator was called yet or not, parked elevators are not started
         self.prv_open_time = 21600  # previous time the elevator was open at
-        self.gen_floors = {1: 2, 2: 10, 3: 17, 4: 20}  # switch case for generating initial floors
+        self.breakdown = False  # gets stuck when it opens its doors next, see Simulation.break_elevator
         if self.saturday:  # start elevator at random floor on saturday
-            self.floor = self.gen_floors.get(self.number)
+            self.floor = building.start_floors[self.number - 1]
         else:
             self.floor = 0
 
-        if self.number <= 2:  # elevators 1,2
-            self.service_floors = set([i for i in range(16)])
-        elif self.number > 2:  # elevators 3,4
-            self.service_floors = set([i for i in range(16, 26)])
-            self.service_floors.add(0)
+        self.service_floors = building.service_floors[self.number - 1]
+        self.capacity = building.capacity  # maximal number of clients
+        self.top = max(self.service_floors)  # top floor of the elevator's zone
+        self.low = min(self.service_floors - {0})  # lowest floor of the elevator's zone, above the lobby
 
     def __repr__(self):
-        return "Elevator {}, {} clients at floor {}".format(self.number, len(self.clients), self.floor)
+        return "Elevator {}, {} clients at floor {}".format(self.number, self.load, self.floor)
+
+    @property
+    def clients(self):
+        """
+        all the clients in the elevator
+        :return: list of Client objects
+        """
+        return [client for riders in self.riders.values() for client in riders] + self.transfers
 
     def stuck(self):
         """
         method to randomize Elevator getting stuck
         :return: boolean
         """
-        if np.random.random(1) <= 0.0005:
+        if self.breakdown:  # forced breakdown, see Simulation.break_elevator
+            self.breakdown = False
+            self.is_stuck = True
+            return True
+        if self.streams.breakdowns.next() <= 0.0005:
             self.is_stuck = True
             return True
         return False
@@ -44,6 +66,12 @@ class Elevator:
         self.is_stuck = False
 
     def add_to_queue(self, floors, direction):
+        """
+        add the source floor of a call to the right queue
+        :param floors: [source floor, desired floor]
+        :param direction: "up" or "down"
+        :return: True if the floor was added to a queue
+        """
         source_floor = floors[0]
         # add press button method so clients will be guaranteed to reach their dest if boarded
         # roll orders to regular queues upon cycle finish
@@ -60,27 +88,52 @@ class Elevator:
         # pick up client on the way down
         elif source_floor < self.floor and not self.up and direction == "down":
             self.down_set.add(source_floor)
+        else:
+            return False
+        return True
+
+    def idle(self):
+        """
+        :return: True if the elevator has no clients and no floors to go to
+        """
+        return not (self.load or self.up_set.mask or self.down_set.mask or self.orders_up.mask or self.orders_down.mask)
+
+    def queued(self):
+        """
+        :return: bitmask of the floors in the elevator's queues, bit i is set if floor i is queued
+        """
+        return self.up_set.mask | self.down_set.mask | self.orders_up.mask | self.orders_down.mask
 
     def free_space(self):
         """
         calculate how many clients can board the Elevator
         :return: int
         """
-        return 15 - len(self.clients)
+        return self.capacity - self.load
 
-    def remove_clients(self, clients_lst):
+    def remove_clients(self, floor):
         """
-        removes client object from Elevator
-        :param clients_lst: clients to be removed (from Floor object)
-        :return:
+        removes the clients getting off at the floor from Elevator
+        :param floor: floor number
+        :return: tuple of (clients that reached their desired floor, clients that get off to swap)
         """
-
         self.doors_open = True
-        for client in clients_lst:
-            client.travelling = False
-            client.floor_time = 0
-            client.current_floor = self.floor  # update client's current floor
-            self.clients.remove(client)
+        arrived = self.riders.pop(floor, [])
+        swapping = []
+        if floor == 0 and self.transfers:
+            swapping = self.transfers
+            self.transfers = []
+        elif self.transfers and floor not in self.service_floors:  # passing a floor outside the zone
+            arrived = [client for client in self.transfers if client.desired_floor == floor]
+            if arrived:
+                self.transfers = [client for client in self.transfers if client.desired_floor != floor]
+        for clients_lst in (arrived, swapping):
+            for client in clients_lst:
+                client.travelling = False
+                client.floor_time = 0
+                client.current_floor = floor  # update client's current floor
+        self.load -= len(arrived) + len(swapping)
+        return arrived, swapping
 
     def board_clients(self, clients_lst):
         """
@@ -88,23 +141,22 @@ class Elevator:
         :param clients_lst:
         :return:
         """
-        if not self.saturday:
-            for client in clients_lst:
-                if self.up:
-                    self.up_set.add(client.desired_floor)
-                else:
-                    if client.desired_floor not in self.service_floors:
-                        self.down_set.add(0)
-                    else:
-                        self.down_set.add(client.desired_floor)
-
-        self.clients += clients_lst
+        riders = self.riders
+        for client in clients_lst:
+            if client.desired_floor not in self.service_floors:
+                self.transfers.append(client)
+            elif client.desired_floor in riders:
+                riders[client.desired_floor].append(client)
+            else:
+                riders[client.desired_floor] = [client]
+
+        self.load += len(clients_lst)
         self.doors_open = False
 
     def travel(self):
         """
         pop floor out of queue, move elevator, flip elevator direction if necessary
-        there are 4 queues for each elevator:
+        there are 4 queues for each elevator, the queues are FloorSet bitmasks:
             up_set is the current queue for the elevator going up
             down_set is the current queue for the elevator going down
             orders_up is the next up queue - when the elevator goes down and up_set and down_set
@@ -115,122 +167,104 @@ class Elevator:
         :return: time of travel between floors
         """
         if self.saturday:
-            # change elevator direction on end of range
-
-            if self.up and self.floor == 0 and self.number in (3, 4):  # travel from 0 to 16
-                self.floor = 16
-                travel_time = 20
-
-            elif not self.up and self.floor == 16:  # go down from 16 to 0
-                self.floor = 0
-                travel_time = 20  # travel from 16 to 0
-
-            elif self.up:  # moving up 1 floor
-                self.floor += 1
-                travel_time = 5
-
-            else:  # moving down 1 floor
-                self.floor -= 1
-                travel_time = 5
-
-            if (self.up and self.floor in (15, 25)) or (not self.up and self.floor == 0):
-                self.up = not self.up
+            self.floor, self.up, travel_time = self.saturday_step(self.floor, self.up)
         else:
             # move to to source floor? ele on 0, request is 5 to 3 > will be pushed to down queue
             # ele on 0, request from 0 to 16
             # ele on 0, request from 0 to 5
             # ele on 0, request from 20 to 16
             # ######### RELOAD QUEUES #########
-            if not self.up_set and self.orders_up:
+            if not self.up_set.mask and self.orders_up.mask:
                 self.up = self.orders_up
-                self.orders_up = set()
-            if not self.down_set and self.down_set:
+                self.orders_up = FloorSet()
+            if not self.down_set.mask and self.down_set.mask:
                 self.down_set = self.orders_down
-                self.orders_down = set()
-            if self.up and not self.up_set and not self.down_set:  # moving up, queues empty
+                self.orders_down = FloorSet()
+            if self.up and not self.up_set.mask and not self.down_set.mask:  # moving up, queues empty
                 self.down_set = self.orders_down
-                self.orders_down = set()
+                self.orders_down = FloorSet()
                 self.up = False
-            elif not self.up and not self.up_set and not self.down_set:
+            elif not self.up and not self.up_set.mask and not self.down_set.mask:
                 self.up_set = self.orders_up
-                self.orders_up = set()
+                self.orders_up = FloorSet()
                 self.up = True
             # ###################################
-            if self.floor == 0 and not self.orders_up and not self.orders_down and not self.up_set and not self.down_set:
-                if self.number <= 2:
-                    next_floor = 15
-                    current = self.floor
-                    self.floor = 15
-                    for i in range(14, -1, -1):
-                        self.down_set.add(i)
-                else:
-                    next_floor = 25
-                    current = self.floor
-                    self.floor = 25
-                    for i in range(24, 14, -1):
-                        self.down_set.add(i)
+            if self.floor == 0 and not self.queued():
+                next_floor = self.top
+                current = self.floor
+                self.floor = self.top
+                self.down_set.add_range(self.low - 1, self.top - 1)  # e.g. 14 to 0, or 24 to 15
                 self.up = False
                 return 4 + abs(current - next_floor)
 
-            elif self.up and self.up_set:
-                next_floor = min(self.up_set)
+            elif self.up and self.up_set.mask:
+                next_floor = self.up_set.lowest()
                 self.up_set.remove(next_floor)
                 travel_time = 4 + abs(self.floor - next_floor)
-            elif not self.up and self.down_set:
-                next_floor = max(self.down_set)
+            elif not self.up and self.down_set.mask:
+                next_floor = self.down_set.highest()
                 self.down_set.remove(next_floor)
                 travel_time = 4 + abs(self.floor - next_floor)
-            elif not self.up_set and not self.down_set:
+            elif not self.up_set.mask and not self.down_set.mask:
                 next_floor = 0
                 self.up = True
                 if 0 in self.orders_up:
                     self.orders_up.remove(0)
                 self.up_set = self.orders_up
-                self.orders_up = set()
+                self.orders_up = FloorSet()
                 self.down_set = self.orders_down
-                self.orders_down = set()
+                self.orders_down = FloorSet()
                 travel_time = 0
-            elif self.up_set:
-                next_floor = min(self.up_set)
+            elif self.up_set.mask:
+                next_floor = self.up_set.lowest()
                 self.up_set.remove(next_floor)
                 self.up = True
                 travel_time = 4 + abs(self.floor - next_floor)
-            elif self.down_set:
-                next_floor = max(self.down_set)
+            else:  # up_set is empty and down_set is not
+                next_floor = self.down_set.highest()
                 self.down_set.remove(next_floor)
                 travel_time = 4 + abs(self.floor - next_floor)
                 self.up = False
-            elif self.orders_up:
-                next_floor = min(self.up_set)
-                self.up_set.remove(next_floor)
-                self.up = True
-                travel_time = 4 + abs(self.floor - next_floor)
-            elif self.orders_down:
-                next_floor = max(self.orders_down)
-                self.orders_down.remove(next_floor)
-                travel_time = 4 + abs(self.floor - next_floor)
-                self.up = False
-
-            else:
-                next_floor = 0
-                self.up = True
-                if 0 in self.orders_up:
-                    self.orders_up.remove(0)
-                travel_time = 0
 
             self.floor = next_floor  # move elevator
             # top or bottom floor, or only 1 of the queues are empty
-            if next_floor in (15, 25) and self.up or next_floor == 0 and not self.up:
+            if next_floor == self.top and self.up or next_floor == 0 and not self.up:
                 self.up = not self.up  # flip elevator direction
-        for client in self.clients:
-            client.travel()
+        # clients are marked travelling when they board, there is nothing to update per client
         return travel_time
 
-    @staticmethod
-    def get_fix_time():
+    def saturday_step(self, floor, up):
+        """
+        next floor of the fixed Saturday cycle
+        :param floor: current floor
+        :param up: current direction
+        :return: tuple of (next floor, direction at the next floor, travel time)
+        """
+        # change elevator direction on end of range
+        if up and floor == 0 and self.low > 1:  # express from 0 to the zone, e.g. 0 to 16
+            floor = self.low
+            travel_time = 20
+
+        elif not up and floor == self.low and self.low > 1:  # go down from the zone to 0
+            floor = 0
+            travel_time = 20  # e.g. travel from 16 to 0
+
+        elif up:  # moving up 1 floor
+            floor += 1
+            travel_time = 5
+
+        else:  # moving down 1 floor
+            floor -= 1
+            travel_time = 5
+
+        if (up and floor == self.top) or (not up and floor == 0):
+            up = not up
+        return floor, up, travel_time
+
+    def get_fix_time(self):
         """
         randomize time for elevator to be fixed
         :return: time of fix in seconds
         """
-        return np.random.uniform(5 * 60, 15 * 60)
+        return self.streams.repairs.next()
 
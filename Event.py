@@ -1,21 +1,65 @@
-class Event:
-    def __init__(self, time, event_type, floor=None, elevator=None, client=None):
+import heapq as hpq
+from collections import deque
+
+# event kinds, the kind is the index of the event handler in the Simulation handlers table
+ARRIVING = 0
+DOOR_OPEN = 1
+DOOR_CLOSE = 2
+ELEVATOR_FIX = 3
+EVENT_NAMES = ("arriving", "door open", "door close", "elevator fix")
+
+
+class EventQueue:
+    def __init__(self, time=0):
         """
+        events are tuples of (time, seq, kind, floor, elevator, client)
         floor and elevator are INDEXES!! Simulation object uses that index to find the objects
+        seq is a running number, events at the same time are handled in the order they were pushed
         :param time: system time
-        :param event_type: event types
-        :param floor: floor index
-        :param elevator: elevator index
         """
-        self.time = time
-        self.event_type = event_type
-        self.floor = floor
-        self.elevator = elevator
-        self.client = client
+        self.time = time  # time of the last popped event
+        self.seq = 0
+        self.heap = []  # future events
+        self.ready = deque()  # events scheduled with zero delay, skip the heap
 
-    def __lt__(self, other):
-        return self.time < other.time
+    def __len__(self):
+        return len(self.heap) + len(self.ready)
 
     def __repr__(self):
-        return "{} : {} f{} e{}".format(self.event_type, self.time, self.floor, self.elevator)
+        return "EventQueue: {} events at {}".format(len(self), self.time)
 
+    def push(self, time, kind, floor=None, elevator=None, client=None):
+        """
+        schedule an event
+        :param time: event time
+        :param kind: event kind
+        :param floor: floor index
+        :param elevator: elevator index
+        :param client: Client object of arriving events
+        :return: None
+        """
+        self.seq += 1
+        if time == self.time:  # zero delay, everything in the heap at this time was pushed before it
+            self.ready.append((time, self.seq, kind, floor, elevator, client))
+        else:
+            hpq.heappush(self.heap, (time, self.seq, kind, floor, elevator, client))
+
+    def next_time(self):
+        """
+        :return: time of the next event
+        """
+        if self.ready and (not self.heap or self.heap[0][0] > self.time):
+            return self.time
+        return self.heap[0][0]
+
+    def pop(self):
+        """
+        pop the next event and advance the queue time
+        :return: event tuple
+        """
+        heap = self.heap
+        if self.ready and (not heap or heap[0][0] > self.time):
+            return self.ready.popleft()
+        event = hpq.heappop(heap)
+        self.time = event[0]
+        return event
@@ -2,89 +2,176 @@ import heapq as hpq
 
 
 class Floor:
-    def __init__(self, number):
+    def __init__(self, number, waiting=None, zones=None):
+        """
+        :param number: floor number
+        :param waiting: number of line parts every zone can take, shared by the floors, not counted if None
+        :param zones: desired floor (None for clients who need a swap) -> indexes of the zones that can take a
+            client from this floor there
+        """
         self.number = number
-        self.line = []  # priority queue
+        # the line is split by (direction, desired floor, got service), every part is a priority queue by arrival
+        # clients who need a swap take any elevator down, their desired floor in the key is None
+        # empty parts are deleted, so the floor only holds parts with clients
+        self.lines = {}
+        self.waiting = waiting
+        self.zones = zones
 
     def __repr__(self):
-        return "Floor: {}, Clients {}".format(self.number, len(self.line))
+        return "Floor: {}, Clients {}".format(self.number, len(self))
+
+    def __len__(self):
+        return sum(map(len, self.lines.values()))
+
+    @property
+    def line(self):
+        """
+        all the clients waiting in the floor
+        :return: list of Client objects
+        """
+        return [client for line in self.lines.values() for client in line]
+
+    @staticmethod
+    def line_key(client):
+        """
+        key of the part of the line the client waits in
+        :param client: Client object
+        :return: tuple of (direction, desired floor, got service)
+        """
+        if client.need_swap:
+            return False, None, client.got_service
+        return client.direction, client.desired_floor, client.got_service
 
     def add_to_line(self, client):
-        hpq.heappush(self.line, client)
+        key = self.line_key(client)
+        line = self.lines.get(key)
+        if line is None:
+            line = self.lines[key] = []
+            self.count_part(key, 1)
+        hpq.heappush(line, client)
 
     def remove_from_line(self, client):
-        self.line.remove(client)
+        key = self.line_key(client)
+        line = self.lines[key]
+        line.remove(client)
+        if line:
+            hpq.heapify(line)
+        else:
+            del self.lines[key]
+            self.count_part(key, -1)
+
+    def abandon(self, client):
+        """
+        remove a client that gave up waiting
+        clients arrive in order, so an abandoning client is first in his part of the line
+        :param client: Client object
+        :return: None
+        """
+        key = self.line_key(client)
+        line = self.lines[key]
+        if line[0] is client:
+            hpq.heappop(line)
+            if not line:
+                del self.lines[key]
+                self.count_part(key, -1)
+        else:
+            self.remove_from_line(client)
+
+    def count_part(self, key, change):
+        """
+        count a part of the line that was added or emptied for the zones that can take its clients
+        :param key: key of the part of the line
+        :param change: 1 if the part was added, -1 if it was emptied
+        :return: None
+        """
+        if self.waiting is not None:
+            for zone in self.zones[key[1]]:
+                self.waiting[zone] += change
 
     def order_line(self):
         """
         use this method to order the line after client abandoning
         :return:
         """
-        hpq.heapify(self.line)  # reorder the line
+        for line in self.lines.values():
+            hpq.heapify(line)  # reorder the line
+
+    def transfers(self):
+        """
+        clients that got off an elevator to swap to another one
+        :return: list of Client objects
+        """
+        return [client for key, line in self.lines.items() if key[2] for client in line]
 
     def drop_clients(self, elevator, curr_time):
         """
         method to drop clients in matching floor
         :param elevator: Elevator object
-        :return: None
+        :return: list of clients that reached their desired floor
         """
-        dropped = 0
-        leaving = []
-        service_time = []
-        for client in elevator.clients:
-            if self.number == client.desired_floor:  # client reached desired floor
-                client.time_in_sys = curr_time - client.arrival_time
-                service_time.append(client.time_in_sys)
-                leaving.append(client)
-                dropped += 1
-
-            elif client.desired_floor not in elevator.service_floors and self.number == 0:  # go off elevator for swap
-                client.direction = True
-                leaving.append(client)
-                self.line.append(client)
-                # make client reorder an elevator!
-                dropped += 1
-        if dropped > 0:
-            hpq.heapify(self.line)
-            elevator.remove_clients(leaving)  # remove from system
-
-        return service_time
+        # only the clients getting off are visited, the elevator indexes its clients by their desired floor
+        arrived, swapping = elevator.remove_clients(self.number)
+        for client in arrived:  # client reached desired floor
+            client.time_in_sys = curr_time - client.arrival_time
+        for client in swapping:  # go off elevator for swap
+            client.direction = True
+            self.add_to_line(client)
+            # make client reorder an elevator!
+
+        return arrived
 
     def board_clients(self, elevator, curr_time):
         """
         remove n<= free space in elevator of people from line if they need this elevator
-        :return: None
+        only the parts of the line that can board the elevator are visited, first come first served
+        abandoning clients are removed by the Simulation, the line holds only clients that still wait
+        :return: list of the boarding clients
         """
         boarding = []
-        staying = []
-        abandoned = 0
-
-        while self.line and len(boarding) < elevator.free_space():  # stop boarding people if line is empty or 15 inside
-            client = hpq.heappop(self.line)  # get first person in line
-            if (curr_time - client.arrival_time) > 15*60 and not client.got_service:
-                abandoned += 1
-                continue
-            # if client needs a swap, he will take any elevator down
-            if client.need_swap and not elevator.up:
-                client.got_service = True
-                boarding.append(client)
-                client.travelling = True
-                client.need_swap = False
-            elif elevator.up == client.direction and client.desired_floor in elevator.service_floors:
-                client.got_service = True
-                boarding.append(client)
-                client.travelling = True
+        free_space = elevator.free_space()
+        # parts of the line going in the elevator's direction to floors it serves
+        candidates = [key for key in self.lines if key[0] == elevator.up
+                      and (key[1] is None or key[1] in elevator.service_floors)]
+        heads = [(self.lines[key][0].arrival_time, i) for i, key in enumerate(candidates)]
+        hpq.heapify(heads)
+
+        while heads and len(boarding) < free_space:  # stop boarding people if line is empty or 15 inside
+            i = heads[0][1]
+            key = candidates[i]
+            line = self.lines[key]
+            client = hpq.heappop(line)  # get first person in line
+            if line:
+                hpq.heapreplace(heads, (line[0].arrival_time, i))
             else:
-                staying.append(client)
-        if staying:
-            for client in staying:
-                self.line.append(client)  # push clients back to line
-            hpq.heapify(self.line)  # reorder line
+                hpq.heappop(heads)
+                del self.lines[key]
+                self.count_part(key, -1)
+            # if client needs a swap, he will take any elevator down
+            client.need_swap = False
+            if not client.got_service:
+                client.board_time = curr_time
+            client.got_service = True
+            boarding.append(client)
+            client.travelling = True
 
         elevator.board_clients(boarding)  # board clients to elevator
-        return abandoned
+        return boarding
 
 
 if __name__ == "__main__":
-    # test adding and removing from elevator
-    pass
+    # the zones' counts of line parts match the floors' lines, checked after every event time of whole days
+    from Simulation import Simulation
+
+    for saturday in (True, False):
+        sim = Simulation(saturday)
+        for day in range(2):
+            sim.start_day(day)
+            while sim.events and sim.curr_time < sim.simulation_time:
+                sim.run_until(sim.events.next_time())
+                parts = [0] * len(sim.waiting)
+                for floor in sim.floors:
+                    for key in floor.lines:
+                        for zone in floor.zones[key[1]]:
+                            parts[zone] += 1
+                assert parts == sim.waiting, (saturday, day, sim.curr_time, parts, sim.waiting)
+    print("The zones' waiting counts match the floors' lines")
@@ -0,0 +1,203 @@
+class FloorSet:
+    __slots__ = ("mask",)
+
+    def __init__(self, floors=()):
+        """
+        set of floor numbers stored as an integer bitmask, bit i is set if floor i is in the set
+        lowest/highest floor, adding a range of floors and emptiness checks don't scan the floors
+        :param floors: initial floors
+        """
+        self.mask = 0
+        for floor in floors:
+            self.mask |= 1 << floor
+
+    def __repr__(self):
+        return "FloorSet({})".format(list(self))
+
+    def __bool__(self):
+        return self.mask != 0
+
+    def __len__(self):
+        return bin(self.mask).count("1")
+
+    def __contains__(self, floor):
+        return self.mask >> floor & 1 == 1
+
+    def __iter__(self):
+        mask = self.mask
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+    def add(self, floor):
+        self.mask |= 1 << floor
+
+    def add_range(self, low, high):
+        """
+        add floors low to high (including)
+        """
+        if low <= high:
+            self.mask |= (1 << (high + 1)) - (1 << low)
+
+    def remove(self, floor):
+        if not self.mask >> floor & 1:
+            raise KeyError(floor)
+        self.mask ^= 1 << floor
+
+    def discard(self, floor):
+        self.mask &= ~(1 << floor)
+
+    def lowest(self):
+        """
+        :return: lowest floor in the set
+        """
+        if not self.mask:
+            raise ValueError("lowest() of an empty FloorSet")
+        return (self.mask & -self.mask).bit_length() - 1
+
+    def highest(self):
+        """
+        :return: highest floor in the set
+        """
+        if not self.mask:
+            raise ValueError("highest() of an empty FloorSet")
+        return self.mask.bit_length() - 1
+
+    def above(self, floor):
+        """
+        :return: lowest floor in the set above the floor, None if there is none
+        """
+        mask = self.mask >> (floor + 1) << (floor + 1)
+        return (mask & -mask).bit_length() - 1 if mask else None
+
+    def below(self, floor):
+        """
+        :return: highest floor in the set below the floor, None if there is none
+        """
+        mask = self.mask & ((1 << floor) - 1) if floor > 0 else 0
+        return mask.bit_length() - 1 if mask else None
+
+
+class SetQueue(set):
+    """
+    the original set based stop queue, used to test FloorSet
+    """
+    def add_range(self, low, high):
+        for floor in range(high, low - 1, -1):
+            self.add(floor)
+
+    def lowest(self):
+        return min(self)
+
+    def highest(self):
+        return max(self)
+
+    @property
+    def mask(self):
+        return sum(1 << floor for floor in self)
+
+
+if __name__ == "__main__":
+    # equivalence tests against the set based queues
+    import random
+    import Elevator
+    from Simulation import Simulation
+
+    # random operations give the same results
+    rnd = random.Random(0)
+    for _ in range(2000):
+        fast, ref = FloorSet(), SetQueue()
+        for _ in range(30):
+            op, floor = rnd.randrange(6), rnd.randrange(60)
+            if op == 0:
+                fast.add(floor)
+                ref.add(floor)
+            elif op == 1:
+                fast.discard(floor)
+                ref.discard(floor)
+            elif op == 2:
+                low = rnd.randrange(60)
+                fast.add_range(low, floor)
+                ref.add_range(low, floor)
+            elif op == 3 and ref:
+                assert fast.lowest() == ref.lowest() and fast.highest() == ref.highest()
+            elif op == 4:
+                assert fast.above(floor) == min([f for f in ref if f > floor], default=None)
+                assert fast.below(floor) == max([f for f in ref if f < floor], default=None)
+            assert bool(fast) == bool(ref) and len(fast) == len(ref) and set(fast) == ref
+            assert (floor in fast) == (floor in ref)
+
+    def set_travel(self):
+        """
+        Elevator.travel of the Suggested elevators as it was with set queues, before FloorSet
+        its last branches (orders_up, orders_down and the final else) were unreachable and are left out
+        :return: time of travel between floors
+        """
+        # ######### RELOAD QUEUES #########
+        if not self.up_set and self.orders_up:
+            self.up = self.orders_up
+            self.orders_up = SetQueue()
+        if not self.down_set and self.down_set:
+            self.down_set = self.orders_down
+            self.orders_down = SetQueue()
+        if self.up and not self.up_set and not self.down_set:  # moving up, queues empty
+            self.down_set = self.orders_down
+            self.orders_down = SetQueue()
+            self.up = False
+        elif not self.up and not self.up_set and not self.down_set:
+            self.up_set = self.orders_up
+            self.orders_up = SetQueue()
+            self.up = True
+        # ###################################
+        if self.floor == 0 and not self.orders_up and not self.orders_down and not self.up_set and not self.down_set:
+            next_floor = self.top
+            current = self.floor
+            self.floor = self.top
+            for i in range(self.top - 1, self.low - 2, -1):  # e.g. 14 to 0, or 24 to 15
+                self.down_set.add(i)
+            self.up = False
+            return 4 + abs(current - next_floor)
+        elif self.up and self.up_set:
+            next_floor = min(self.up_set)
+            self.up_set.remove(next_floor)
+            travel_time = 4 + abs(self.floor - next_floor)
+        elif not self.up and self.down_set:
+            next_floor = max(self.down_set)
+            self.down_set.remove(next_floor)
+            travel_time = 4 + abs(self.floor - next_floor)
+        elif not self.up_set and not self.down_set:
+            next_floor = 0
+            self.up = True
+            if 0 in self.orders_up:
+                self.orders_up.remove(0)
+            self.up_set = self.orders_up
+            self.orders_up = SetQueue()
+            self.down_set = self.orders_down
+            self.orders_down = SetQueue()
+            travel_time = 0
+        elif self.up_set:
+            next_floor = min(self.up_set)
+            self.up_set.remove(next_floor)
+            self.up = True
+            travel_time = 4 + abs(self.floor - next_floor)
+        else:
+            next_floor = max(self.down_set)
+            self.down_set.remove(next_floor)
+            travel_time = 4 + abs(self.floor - next_floor)
+            self.up = False
+        self.floor = next_floor  # move elevator
+        # top or bottom floor, or only 1 of the queues are empty
+        if next_floor == self.top and self.up or next_floor == 0 and not self.up:
+            self.up = not self.up  # flip elevator direction
+        return travel_time
+
+    # the Suggested elevators stop at the same floors in the same order as with the set based travel, so whole days
+    # give the same results (Saturday elevators don't use the queues)
+    fast_days = [Simulation(False).run_day(day) for day in range(3)]
+    travel = Elevator.Elevator.travel
+    Elevator.FloorSet, Elevator.Elevator.travel = SetQueue, set_travel
+    ref_days = [Simulation(False).run_day(day) for day in range(3)]
+    Elevator.FloorSet, Elevator.Elevator.travel = FloorSet, travel
+    assert fast_days == ref_days
+    print("FloorSet is equivalent to the set based queues")
@@ -0,0 +1,113 @@
+class HallCallRegistry:
+    def __init__(self, service_floors):
+        """
+        lit hall call buttons and the elevator assigned to each of them
+        a call is keyed by (floor, direction, group), group is the tuple of elevators that can take the client
+        :param service_floors: list of the service floors set of every elevator
+        """
+        self.service_floors = service_floors
+        self.calls = {}  # call key -> (elevator index, desired floor)
+        # call keys assigned to every elevator, dictionaries keep the order of assignment
+        self.by_elevator = [{} for _ in service_floors]
+        self.groups = {}  # (floor, desired floor) -> group
+        self.presses = 0  # number of button presses
+        self.dispatches = 0  # number of presses that needed an elevator to be chosen
+
+    def __repr__(self):
+        return "HallCallRegistry: {} active calls, {} presses, {} dispatches".format(
+            len(self.calls), self.presses, self.dispatches)
+
+    def __len__(self):
+        return len(self.calls)
+
+    def group(self, floor, desired_floor):
+        """
+        :return: tuple of indexes of the elevators serving both floors
+        """
+        group = self.groups.get((floor, desired_floor))
+        if group is None:
+            group = self.groups[floor, desired_floor] = tuple(
+                i for i, floors in enumerate(self.service_floors) if floor in floors and desired_floor in floors)
+        return group
+
+    def key(self, floor, direction, desired_floor):
+        return floor, direction, self.group(floor, desired_floor)
+
+    def assigned(self, key):
+        """
+        :param key: call key
+        :return: index of the elevator assigned to the call, None if the button is not lit
+        """
+        call = self.calls.get(key)
+        return call[0] if call is not None else None
+
+    def assign(self, key, elevator, desired_floor):
+        """
+        :param key: call key
+        :param elevator: elevator index
+        :param desired_floor: desired floor of the client who pressed, used to reassign the call
+        :return: None
+        """
+        self.calls[key] = (elevator, desired_floor)
+        self.by_elevator[elevator][key] = desired_floor
+
+    def serve(self, floor, elevator):
+        """
+        turn off the buttons of the floor the elevator opened its doors at
+        :param floor: floor number
+        :param elevator: elevator index
+        :return: None
+        """
+        keys = self.by_elevator[elevator]
+        if not keys:
+            return
+        served = [key for key in keys if key[0] == floor]
+        for key in served:
+            del keys[key]
+            del self.calls[key]
+
+    def release(self, elevator, floors=None):
+        """
+        remove the calls of an elevator, so they can be reassigned
+        all of them when it got stuck, or the calls of floors that left its queues without a stop
+        :param elevator: elevator index
+        :param floors: bitmask of the floors of the removed calls (see Elevator.queued), None for all the calls
+        :return: list of (call key, desired floor) of the removed calls
+        """
+        keys = self.by_elevator[elevator]
+        if floors is None:
+            released = list(keys.items())
+            self.by_elevator[elevator] = {}
+        else:
+            released = [(key, desired_floor) for key, desired_floor in keys.items() if floors >> key[0] & 1]
+            for key, _ in released:
+                del keys[key]
+        for key, _ in released:
+            del self.calls[key]
+        return released
+
+    def unqueued(self, elevators):
+        """
+        calls that their elevator will not serve: the floor is not in its queues and it is not stopping there next
+        there should be none, a lit button is not pressed again, so the clients of such a call wait for nothing
+        :param elevators: list of the Elevator objects
+        :return: list of call keys
+        """
+        return [key for key, (elevator, _) in self.calls.items()
+                if key[0] != elevators[elevator].floor and not elevators[elevator].queued() >> key[0] & 1]
+
+
+if __name__ == "__main__":
+    # every lit button has an elevator that will stop at its floor, checked after every event time of whole days
+    from Simulation import Simulation
+    from Dispatchers import SuggestedDispatcher, ZoneDispatcher
+
+    for dispatcher in (SuggestedDispatcher, ZoneDispatcher):
+        sim = Simulation(False, dispatcher=dispatcher())
+        for day in range(3):
+            sim.start_day(day)
+            while sim.events and sim.curr_time < sim.simulation_time:
+                sim.run_until(sim.events.next_time())
+                unqueued = sim.hall_calls.unqueued(sim.elevators)
+                assert not unqueued, (dispatcher.name, day, sim.curr_time, unqueued)
+    print("All hall calls are queued by their elevators")
@@ -0,0 +1,139 @@
+import time
+from Event import ARRIVING, DOOR_OPEN, DOOR_CLOSE, EVENT_NAMES
+
+
+class Instruments:
+    def __init__(self):
+        """
+        counters and timers of the simulation's event loop, set Simulation.instruments to turn them on
+        when Simulation.instruments is None the plain event loop runs and nothing is measured
+        Simulation.run_until calls before_event and after_event around every handled event of a measured day
+        days are measured in the process that simulates them, so instrumented runs are serial
+        """
+        self.reports = []  # report of every simulated day
+        # counters of the measured day, see start_day
+        self.day = None
+        self.counts = []  # handled events per kind
+        self.times = []  # handler seconds per kind
+        self.line_max = []  # longest line of every floor
+        self.passes = []  # number of clients boarding in every door close
+        self.heap_max = 0
+        self.riders = 0  # clients in the elevator before the handled door close
+        self.start = 0.0
+        self.handler_start = 0.0
+
+    def __repr__(self):
+        return "Instruments: {} days".format(len(self.reports))
+
+    def start_day(self, sim, day):
+        """
+        start measuring a day, Simulation.start_day calls it before the day's events are handled
+        :param sim: Simulation object, ready to run the day
+        :param day: day index
+        :return: None
+        """
+        kinds = len(sim.handlers)
+        self.day = day
+        self.counts = [0] * kinds
+        self.times = [0.0] * kinds
+        self.line_max = [0] * len(sim.floors)
+        self.passes = []
+        self.heap_max = 0
+        self.start = time.perf_counter()
+
+    def before_event(self, sim, event):
+        """
+        :param sim: Simulation object
+        :param event: event tuple popped from the events queue
+        :return: None
+        """
+        pending = len(sim.events) + 1  # events in the queue before the event was popped
+        if pending > self.heap_max:
+            self.heap_max = pending
+        if event[2] == DOOR_CLOSE:
+            self.riders = sim.elevators[event[4] - 1].load
+        self.handler_start = time.perf_counter()
+
+    def after_event(self, sim, event):
+        """
+        :param sim: Simulation object
+        :param event: event tuple, after its handler ran
+        :return: None
+        """
+        elapsed = time.perf_counter() - self.handler_start
+        _, _, kind, floor, elevator, client = event
+        self.times[kind] += elapsed
+        self.counts[kind] += 1
+        # lines grow when clients arrive and when clients get off at the lobby to swap
+        if kind == ARRIVING:
+            floor = client.current_floor
+        if kind == ARRIVING or (kind == DOOR_OPEN and floor == 0):
+            length = len(sim.floors[floor])
+            if length > self.line_max[floor]:
+                self.line_max[floor] = length
+        elif kind == DOOR_CLOSE:
+            self.passes.append(sim.elevators[elevator - 1].load - self.riders)
+
+    def end_day(self):
+        """
+        Simulation.end_day calls it after the day's events were handled
+        :return: report of the measured day
+        """
+        wall = time.perf_counter() - self.start
+        counts, times, passes = self.counts, self.times, self.passes
+        report = {
+            "day": self.day,
+            "events": sum(counts),
+            "seconds": wall,
+            "events_per_second": sum(counts) / wall if wall else 0.0,
+            "kinds": {EVENT_NAMES[kind]: {"count": counts[kind], "seconds": times[kind]} for kind in range(len(counts))},
+            "heap_max": self.heap_max,
+            "line_max": self.line_max,
+            "boarding_passes": len(passes),
+            "boarding_mean": sum(passes) / len(passes) if passes else 0.0,
+            "boarding_max": max(passes, default=0),
+        }
+        self.reports.append(report)
+        return report
+
+    def aggregate(self):
+        """
+        :return: report of all the measured days, in the format of a day report, day is the number of days
+        """
+        reports = self.reports
+        events = sum(report["events"] for report in reports)
+        wall = sum(report["seconds"] for report in reports)
+        passes = sum(report["boarding_passes"] for report in reports)
+        return {
+            "day": len(reports),
+            "events": events,
+            "seconds": wall,
+            "events_per_second": events / wall if wall else 0.0,
+            "kinds": {name: {"count": sum(report["kinds"][name]["count"] for report in reports),
+                             "seconds": sum(report["kinds"][name]["seconds"] for report in reports)}
+                      for name in EVENT_NAMES},
+            "heap_max": max((report["heap_max"] for report in reports), default=0),
+            "line_max": [max(lines) for lines in zip(*(report["line_max"] for report in reports))],
+            "boarding_passes": passes,
+            "boarding_mean": sum(report["boarding_mean"] * report["boarding_passes"]
+                                 for report in reports) / passes if passes else 0.0,
+            "boarding_max": max((report["boarding_max"] for report in reports), default=0),
+        }
+
+
+def format_report(report, title):
+    """
+    :param report: day or aggregated report of Instruments
+    :param title: first line of the text
+    :return: text of the report
+    """
+    lines = [title, "  {} events in {:.3f}s, {:.0f} events/s, events heap max {}".format(
+        report["events"], report["seconds"], report["events_per_second"], report["heap_max"])]
+    for name, kind in report["kinds"].items():
+        per_event = kind["seconds"] / kind["count"] * 10 ** 6 if kind["count"] else 0.0
+        lines.append("  {:<13}{:>9} events {:>9.3f}s {:>7.2f}us/event".format(
+            name, kind["count"], kind["seconds"], per_event))
+    lines.append("  boarding passes {}, mean {:.2f}, max {}".format(
+        report["boarding_passes"], report["boarding_mean"], report["boarding_max"]))
+    lines.append("  floor lines max {}".format(report["line_max"]))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,214 @@
+import math
+import numpy as np
+
+SERVICE_EDGES = (60, 120, 180, 240, 300)  # default upper edges of the service time buckets, the last bucket is open
+OPEN_BUCKET = 1000  # key of the open service time bucket, the original script's key for over 5 minutes
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+def histogram(values, edges):
+    """
+    count values per bucket, a bucket includes its upper edge (t <= 60 is the first bucket)
+    :param values: array of values
+    :param edges: increasing upper edges of the buckets, the last bucket holds values above the last edge
+    :return: array of len(edges) + 1 counts
+    """
+    return np.bincount(np.searchsorted(edges, values, side="left"), minlength=len(edges) + 1)
+
+
+def service_buckets(edges):
+    """
+    :param edges: increasing upper edges of the service time buckets, below OPEN_BUCKET
+    :return: list of the buckets' keys, the edges and OPEN_BUCKET
+    """
+    return list(edges) + [OPEN_BUCKET]
+
+
+def bucket_labels(edges):
+    """
+    plot labels of the service time buckets in minutes, e.g. T<1, 1<T<2 and T>5
+    :param edges: upper edges of the buckets in seconds
+    :return: list of len(edges) + 1 labels
+    """
+    minutes = ["{:g}".format(edge / 60) for edge in edges]
+    return (["T<" + minutes[0]] + ["{}<T<{}".format(low, high) for low, high in zip(minutes, minutes[1:])] +
+            ["T>" + minutes[-1]])
+
+
+class ClientRecords:
+    def __init__(self, size=16384):
+        """
+        per client records of a day, in preallocated numpy columns that grow when full
+        a client is recorded when he gets off at his desired floor
+        :param size: initial number of rows
+        """
+        self.size = 0
+        self.arrival = np.empty(size)  # arrival time
+        self.board = np.empty(size)  # time of first boarding
+        self.alight = np.empty(size)  # time of getting off at the desired floor
+        self.source = np.empty(size, dtype=np.int16)  # floor of arrival
+        self.destination = np.empty(size, dtype=np.int16)  # desired floor
+        self.elevator = np.empty(size, dtype=np.int16)  # number of the elevator the client got off
+
+    def __repr__(self):
+        return "ClientRecords: {} clients".format(self.size)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, client, alight, elevator):
+        """
+        :param client: Client object that reached his desired floor
+        :param alight: time of getting off
+        :param elevator: elevator number
+        :return: None
+        """
+        i = self.size
+        if i == len(self.arrival):
+            self.grow()
+        self.arrival[i] = client.arrival_time
+        self.board[i] = client.board_time
+        self.alight[i] = alight
+        self.source[i] = client.source_floor
+        self.destination[i] = client.desired_floor
+        self.elevator[i] = elevator
+        self.size = i + 1
+
+    def extend(self, arrival, board, alight, source, destination, elevator):
+        """
+        add many clients at once, arguments are arrays of the ClientRecords columns
+        :return: None
+        """
+        i = self.size
+        while i + len(arrival) > len(self.arrival):
+            self.grow()
+        for name, values in (("arrival", arrival), ("board", board), ("alight", alight), ("source", source),
+                             ("destination", destination), ("elevator", elevator)):
+            getattr(self, name)[i:i + len(arrival)] = values
+        self.size = i + len(arrival)
+
+    def grow(self):
+        for name in ("arrival", "board", "alight", "source", "destination", "elevator"):
+            column = getattr(self, name)
+            grown = np.empty(len(column) * 2, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def clear(self):
+        self.size = 0
+
+    def service_times(self):
+        """
+        :return: array of times from arrival to getting off
+        """
+        return self.alight[:self.size] - self.arrival[:self.size]
+
+    def wait_times(self):
+        """
+        :return: array of times from arrival to first boarding
+        """
+        return self.board[:self.size] - self.arrival[:self.size]
+
+    def ride_times(self):
+        """
+        :return: array of times from first boarding to getting off, including a swap at the lobby
+        """
+        return self.alight[:self.size] - self.board[:self.size]
+
+
+class QuantileSketch:
+    def __init__(self, accuracy=0.01, low=0.1, high=10 ** 6):
+        """
+        mergeable quantile sketch, values are counted in logarithmic buckets so quantiles have a relative error
+        of at most accuracy, sketches of different days and workers are merged by adding their counts
+        :param accuracy: relative accuracy of the quantiles
+        :param low: smaller values are counted as low
+        :param high: larger values are counted as high
+        """
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.low = low
+        self.high = high
+        self.offset = math.ceil(math.log(low) / self.log_gamma)  # index of the first bucket
+        self.counts = np.zeros(math.ceil(math.log(high) / self.log_gamma) - self.offset + 1, dtype=np.int64)
+
+    def __repr__(self):
+        return "QuantileSketch: {} values, p50={:.1f}, p95={:.1f}, p99={:.1f}".format(
+            self.count(), *(self.quantile(q) for q in PERCENTILES))
+
+    def count(self):
+        return int(self.counts.sum())
+
+    def add(self, values):
+        """
+        :param values: array of values
+        :return: None
+        """
+        values = np.clip(np.asarray(values, dtype=float), self.low, self.high)
+        index = np.ceil(np.log(values) / self.log_gamma).astype(np.int64) - self.offset
+        self.counts += np.bincount(index, minlength=len(self.counts))
+
+    def merge(self, other):
+        """
+        :param other: QuantileSketch with the same accuracy and range
+        :return: None
+        """
+        if len(other.counts) != len(self.counts) or other.offset != self.offset:
+            raise ValueError("Can't merge sketches of different accuracy or range")
+        self.counts += other.counts
+
+    def quantile(self, q):
+        """
+        :param q: quantile, between 0 and 1
+        :return: estimated value, nan if the sketch is empty
+        """
+        total = self.counts.sum()
+        if total == 0:
+            return math.nan
+        bucket = int(np.searchsorted(np.cumsum(self.counts), q * (total - 1), side="right"))
+        return 2 * self.gamma ** (bucket + self.offset) / (self.gamma + 1)
+
+    def to_tuple(self):
+        """
+        compact form for day results, the counts between the first and last non empty buckets
+        :return: tuple of (index of the first counted bucket, list of counts)
+        """
+        nonzero = np.flatnonzero(self.counts)
+        if not len(nonzero):
+            return 0, []
+        return int(nonzero[0]), self.counts[nonzero[0]:nonzero[-1] + 1].tolist()
+
+    @staticmethod
+    def from_tuple(compact, accuracy=0.01):
+        """
+        :param compact: tuple returned by QuantileSketch.to_tuple
+        :param accuracy: accuracy of the sketch
+        :return: QuantileSketch object
+        """
+        sketch = QuantileSketch(accuracy)
+        start, counts = compact
+        sketch.counts[start:start + len(counts)] = counts
+        return sketch
+
+
+if __name__ == "__main__":
+    # the sketch's quantiles are within its accuracy of the exact quantiles, also after merging
+    rng = np.random.default_rng(0)
+    parts = [rng.lognormal(4, 1, 5000) for _ in range(4)]
+    merged = QuantileSketch()
+    for part in parts:
+        sketch = QuantileSketch()
+        sketch.add(part)
+        merged.merge(QuantileSketch.from_tuple(sketch.to_tuple()))
+    values = np.sort(np.concatenate(parts))
+    for q in PERCENTILES:
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(merged.quantile(q) - exact) <= 0.01 * exact, q
+    # buckets include their upper edge, like the original service time buckets
+    assert histogram(np.array([0, 60, 60.5, 300, 301]), SERVICE_EDGES).tolist() == [2, 1, 0, 0, 1, 1]
+    assert histogram(np.array([0, 60, 90, 301]), (30, 90)).tolist() == [1, 2, 1]
+    assert service_buckets(SERVICE_EDGES) == [60, 120, 180, 240, 300, 1000]
+    assert bucket_labels(SERVICE_EDGES) == ["T<1", "1<T<2", "2<T<3", "3<T<4", "4<T<5", "T>5"]
+    assert bucket_labels((30, 90)) == ["T<0.5", "0.5<T<1.5", "T>1.5"]
+    print("QuantileSketch quantiles are within 1% of the exact quantiles")
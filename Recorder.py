@@ -0,0 +1,152 @@
+import numpy as np
+from Event import ARRIVING, EVENT_NAMES
+
+# a record per handled event
+RECORD = np.dtype([
+    ("seq", np.uint64),  # running number of the record, from 1, 0 marks an empty slot
+    ("day", np.uint16),  # day index
+    ("time", np.float64),  # event time
+    ("kind", np.uint8),  # event kind, index of Event.EVENT_NAMES
+    ("floor", np.int16),  # floor number, the client's floor for arrivals, -1 if the event has no floor
+    ("elevator", np.int16),  # elevator number, -1 if the event has no elevator
+    ("client", np.int32),  # number of the arriving client in the day, -1 for other events
+    ("pending", np.uint32),  # number of events left in the events queue
+])
+
+
+class EventRecorder:
+    def __init__(self, capacity=2 ** 20, path=None, block=4096):
+        """
+        records every handled event into a preallocated ring buffer, the oldest records are overwritten when full
+        set Simulation.recorder to record days from their start, the fields of the events are written to
+        preallocated numpy columns of a block, and the block is copied to the ring when it is full
+        :param capacity: number of records in the ring
+        :param path: .npy file backing the ring, memory mapped, None to keep the ring in memory
+        :param block: number of records copied to the ring at once
+        """
+        self.capacity = capacity
+        self.path = path
+        self.block = block
+        if path is None:
+            self.ring = np.zeros(capacity, dtype=RECORD)
+        else:
+            self.ring = np.lib.format.open_memmap(path, mode="w+", dtype=RECORD, shape=(capacity,))
+        self.seq = 0  # number of records
+        # a column per field of the block's events, written through memoryviews, which are faster than numpy indexing
+        self.times = np.zeros(block)
+        self.kinds = np.zeros(block, dtype=np.uint8)
+        self.floors = np.zeros(block, dtype=np.int16)  # the client's floor for arrivals, -1 if the event has no floor
+        self.elevators = np.zeros(block, dtype=np.int16)  # -1 if the event has no elevator
+        self.pushed = np.zeros(block, dtype=np.uint64)  # number of events pushed to the queue when it was handled
+        self.columns = tuple(memoryview(column) for column in
+                             (self.times, self.kinds, self.floors, self.elevators, self.pushed))
+        self.pending = 0  # number of events in the block, not copied to the ring yet
+        self.day = 0
+        self.clients = 0  # number of arrivals in the day
+        self.popped = 0  # number of events handled in the day
+
+    def __repr__(self):
+        return "EventRecorder: {} events, ring of {}".format(self.seq + self.pending, self.capacity)
+
+    def start_day(self, day):
+        self.flush()  # a block holds events of a single day
+        self.day = day
+        self.clients = 0
+        self.popped = 0
+
+    def before_event(self, sim, event):
+        """
+        record an event, Simulation.run_until calls it before handling the event
+        :param sim: Simulation object
+        :param event: event tuple popped from the events queue
+        :return: None
+        """
+        times, kinds, floors, elevators, pushed = self.columns
+        i = self.pending
+        time, _, kind, floor, elevator, client = event
+        times[i] = time
+        kinds[i] = kind
+        if client is not None:  # arriving client
+            floor = client.source_floor
+        floors[i] = -1 if floor is None else floor
+        elevators[i] = -1 if elevator is None else elevator
+        pushed[i] = sim.events.seq  # number of events pushed to the queue so far
+        self.pending = i + 1
+        if i + 1 == self.block:
+            self.flush()
+
+    def flush(self):
+        """
+        convert the block's events to records and copy them to the ring
+        :return: None
+        """
+        count = self.pending
+        if not count:
+            return
+        kinds = self.kinds[:count]
+        arriving = kinds == ARRIVING
+        clients = np.full(count, -1, dtype=np.int32)
+        clients[arriving] = np.arange(self.clients, self.clients + arriving.sum())
+        self.clients += int(arriving.sum())
+        records = np.empty(count, dtype=RECORD)
+        records["day"] = self.day
+        records["time"] = self.times[:count]
+        records["kind"] = kinds
+        records["floor"] = self.floors[:count]
+        records["elevator"] = self.elevators[:count]
+        records["client"] = clients
+        records["pending"] = self.pushed[:count] - np.arange(self.popped + 1, self.popped + count + 1, dtype=np.uint64)
+        self.popped += count
+        start = self.seq
+        self.seq += count
+        self.pending = 0
+        if len(records) > self.capacity:  # only the newest records fit
+            start += len(records) - self.capacity
+            records = records[-self.capacity:]
+        positions = np.arange(start, start + len(records)) % self.capacity
+        ring = self.ring
+        records["seq"] = np.arange(start + 1, start + len(records) + 1)
+        ring[positions] = records
+
+    def close(self):
+        """
+        flush the records, and the memory mapped file
+        :return: None
+        """
+        self.flush()
+        if self.path is not None:
+            self.ring.flush()
+
+    def events(self):
+        """
+        :return: recorded events in order, structured numpy array of RECORD
+        """
+        self.flush()
+        return ordered(self.ring)
+
+
+def ordered(ring):
+    """
+    :param ring: ring of records
+    :return: records in order, without empty slots
+    """
+    records = ring[ring["seq"] > 0]
+    return records[np.argsort(records["seq"], kind="stable")]
+
+
+def read_events(path):
+    """
+    load an event trace written by EventRecorder
+    :param path: .npy file
+    :return: recorded events in order, structured numpy array of RECORD, a column per field e.g. events["time"]
+    """
+    return ordered(np.load(path, mmap_mode="r"))
+
+
+def summary(events):
+    """
+    :param events: recorded events
+    :return: dictionary of event kind name to number of events
+    """
+    counts = np.bincount(events["kind"], minlength=len(EVENT_NAMES))
+    return {name: int(count) for name, count in zip(EVENT_NAMES, counts)}
@@ -0,0 +1,92 @@
+import math
+from statistics import NormalDist
+from Metrics import QuantileSketch
+
+# metrics of a day, computed from the result tuple returned by Simulation.run_day
+METRICS = {
+    "abandoned": lambda result: result[0],  # number of abandoning clients
+    "occupancy": lambda result: sum(result[3]) / len(result[3]),  # mean elevator occupancy
+    "service_p95": lambda result: QuantileSketch.from_tuple(result[4]["service"]).quantile(0.95),  # tail service time
+}
+
+
+class RunningStat:
+    def __init__(self):
+        """
+        online mean and variance (Welford's algorithm)
+        """
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared distances from the mean
+
+    def __repr__(self):
+        return "RunningStat: n={}, mean={:.4f}, std={:.4f}".format(self.count, self.mean, self.std())
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def std(self):
+        """
+        :return: sample standard deviation
+        """
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(self.m2 / (self.count - 1))
+
+    def half_width(self, z):
+        """
+        half width of the confidence interval of the mean
+        :param z: normal quantile of the confidence level
+        :return: float, infinity if there are less than 2 values
+        """
+        if self.count < 2:
+            return math.inf
+        return z * self.std() / math.sqrt(self.count)
+
+
+class SequentialStopping:
+    def __init__(self, targets, min_days=10, confidence=0.95):
+        """
+        decides when enough days were simulated, the cap on days is given to Simulation.run
+        :param targets: dictionary of metric name (key of METRICS) to the wanted confidence interval half width
+        :param min_days: minimal number of days before stopping
+        :param confidence: confidence level of the intervals
+        """
+        for name in targets:
+            if name not in METRICS:
+                raise ValueError("Unknown metric {}, choose from {}".format(name, list(METRICS)))
+        self.targets = targets
+        self.min_days = max(min_days, 2)
+        self.confidence = confidence
+        self.z = NormalDist().inv_cdf((1 + confidence) / 2)
+        self.stats = {name: RunningStat() for name in targets}
+
+    def __repr__(self):
+        return "SequentialStopping: {} days, {}".format(self.days(), self.half_widths())
+
+    def days(self):
+        return min((stat.count for stat in self.stats.values()), default=0)
+
+    def half_widths(self):
+        """
+        :return: dictionary of metric name to current confidence interval half width
+        """
+        return {name: stat.half_width(self.z) for name, stat in self.stats.items()}
+
+    def add(self, result):
+        """
+        add a day's result to the statistics
+        :param result: tuple returned by Simulation.run_day
+        :return: True if all targets are reached
+        """
+        for name, stat in self.stats.items():
+            stat.add(METRICS[name](result))
+        return self.done()
+
+    def done(self):
+        if self.days() < self.min_days:
+            return False
+        return all(stat.half_width(self.z) <= self.targets[name] for name, stat in self.stats.items())
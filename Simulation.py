@@ -1,10 +1,26 @@
+import os
+import sys
+import csv
+import json
+import pickle
+import argparse
 import numpy as np
-import heapq as hpq
-from Event import Event
+from collections import deque
+from multiprocessing import Pool
+from Event import EventQueue, ARRIVING, DOOR_OPEN, DOOR_CLOSE, ELEVATOR_FIX
 from Floor import Floor
 from Elevator import Elevator
 from Client import Client
-import matplotlib.pyplot as plt
+from Arrivals import ArrivalStream, TraceStream, SharedArrivals
+from Streams import RandomStreams
+from Replications import SequentialStopping, METRICS
+from Building import Building
+from Cache import ResultCache
+from HallCalls import HallCallRegistry
+from Metrics import ClientRecords, QuantileSketch, histogram, service_buckets, bucket_labels, PERCENTILES
+from Instruments import Instruments, format_report
+from Recorder import EventRecorder
+from Dispatchers import default_dispatcher, ZoneDispatcher, TimetableDispatcher
 
 
 # ##### default mode is set to Saturday #####
@@ -12,24 +28,50 @@ import matplotlib.pyplot as plt
 
 # noinspection DuplicatedCode
 class Simulation:
-    def __init__(self, saturday):
+    def __init__(self, saturday, seed=1, building=None, arrivals=None, dispatcher=None):
 
         self.simulation_time = 60 * 60 * 20  # simulation runs until 20:00
         self.curr_time = 21600  # simulation clock starts at 6am
-        self.floors = [Floor(i) for i in range(26)]  # creates 25 Floor objects
-        self.events = []  # events heap
+        self.building = building if building is not None else Building()  # floors, elevators and arrivals
+        # zone of every elevator, elevators are numbered zone by zone
+        self.elevator_zones = [zone for zone, count in enumerate(self.building.elevators) for _ in range(count)]
+        self.waiting = [0] * len(self.building.zones)  # number of floor line parts every zone can take, see Floor
+        self.zones = self.zone_map()  # zones that can take the clients of every floor, the same every day
+        self.floors = self.create_floors()  # creates Floor objects
+        self.events = EventQueue(self.curr_time)  # events heap
+        self.deadlines = deque()  # (abandon time, client) in arrival order, expired before later events are handled
         self.abandoned = 0  # number of abandoning clients
         self.saturday = saturday  # working as a Saturday/Suggested elevator (True/False)
-        self.elevators = [Elevator(i, saturday) for i in range(1, 5)]  # create 4 Elevator objects
+        # strategy moving the elevators (see Dispatchers.py), the mode's built-in strategy if None
+        self.dispatcher = dispatcher if dispatcher is not None else default_dispatcher(saturday)
+        self.seed = seed  # seed of the first day
+        self.cache = None  # ResultCache of day results, results are not cached if None
+        self.instruments = None  # Instruments object measuring the event loop, nothing is measured if None
+        self.recorder = None  # EventRecorder of the handled events, nothing is recorded if None
+        self.streams = RandomStreams()  # random streams, seeded for every day
+        self.elevators = self.create_elevators(saturday)  # create Elevator objects
+        self.hall_calls = HallCallRegistry(self.building.service_floors)  # lit buttons and assigned elevators
+        # day's arrivals, random from the building's arrival rates or a TraceStream of recorded arrivals
+        self.arrivals = arrivals if arrivals is not None else ArrivalStream(
+            self.curr_time, self.simulation_time, self.building.periods, self.building.sources,
+            self.building.destinations)
+        # event handlers, indexed by event kind
+        self.handlers = (self.arriving, self.door_open, self.door_close, self.elevator_fix)
 
         # ##### metrics to display #####
-        # create service times distribution dictionary
-        self.service_dist = {60: 0, 120: 0, 180: 0, 240: 0, 300: 0, 1000: 0}  # overall
-        self.service_times = {60: 0, 120: 0, 180: 0, 240: 0, 300: 0, 1000: 0}  # temporary
-        self.capacity_dist = {i: 0 for i in range(16)}  # time distribution of number of passengers in the elevators
-        self.elevator_mat = np.zeros((100, 4))  # 100 days per elevator
-        self.elevators_avg_cap = [0, 0, 0, 0] #
+        # create service times distribution dictionary, keyed by the buckets' upper edges, 1000 is the open bucket
+        self.service_dist = dict.fromkeys(service_buckets(self.building.service_edges), 0)  # overall
+        self.service_times = dict.fromkeys(service_buckets(self.building.service_edges), 0)  # temporary
+        self.records = ClientRecords()  # records of the clients that reached their desired floor today
+        # quantile sketches of the service, waiting and riding times of all days
+        self.sketches = {"service": QuantileSketch(), "wait": QuantileSketch(), "ride": QuantileSketch()}
+        capacity = self.building.capacity
+        self.capacity_dist = {i: 0 for i in range(capacity + 1)}  # time distribution of number of passengers in the elevators
+        self.day_capacity = {i: 0 for i in range(capacity + 1)}  # capacity distribution of the current day
+        self.elevator_mat = np.zeros((100, len(self.elevators)))  # average capacity, row per day, column per elevator
+        self.elevators_avg_cap = [0] * len(self.elevators)
         self.abandoned_lst = []
+        self.idle_log = []  # (time, elevator number, floor, "park"/"wake") of the current day
 
     def reset_simulation(self, saturday):
         """
@@ -38,215 +80,192 @@ class Simulation:
         :return: None
         """
         self.curr_time = 21600  # simulation clock starts at 6am
-        self.floors = [Floor(i) for i in range(26)]
-        self.elevators = [Elevator(i, saturday) for i in range(1, 5)]
-        self.events = []
+        self.waiting = [0] * len(self.building.zones)
+        self.floors = self.create_floors()
+        self.elevators = self.create_elevators(saturday)
+        self.hall_calls = HallCallRegistry(self.building.service_floors)
+        self.events = EventQueue(self.curr_time)
+        self.deadlines = deque()
         self.abandoned = 0
-        self.elevators_avg_cap = [0, 0, 0, 0]
+        self.elevators_avg_cap = [0] * len(self.elevators)
         self.saturday = saturday  # working as a Saturday elevator
-        self.service_dist = {60: 0, 120: 0, 180: 0, 240: 0, 300: 0, 1000: 0}
+        self.service_dist = dict.fromkeys(service_buckets(self.building.service_edges), 0)
+        self.records.clear()
+        self.day_capacity = {i: 0 for i in range(self.building.capacity + 1)}
+        self.idle_log = []
+
+    def zone_map(self):
+        """
+        :return: list of the zones that can take the clients of every floor, desired floor (None for clients who
+        need a swap) -> indexes of the zones serving both floors
+        """
+        zones = [{0} | set(range(low, high + 1)) for low, high in self.building.zones]  # service floors of every zone
+        zone_map = []
+        for floor in range(self.building.floors):
+            floor_zones = tuple(zone for zone, service_floors in enumerate(zones) if floor in service_floors)
+            desired_zones = {desired_floor: tuple(zone for zone in floor_zones if desired_floor in zones[zone])
+                             for desired_floor in range(self.building.floors)}
+            desired_zones[None] = floor_zones  # clients who need a swap take any elevator of the floor
+            zone_map.append(desired_zones)
+        return zone_map
+
+    def create_floors(self):
+        """
+        the floors count the parts of their lines by the zones that can take their clients (Simulation.waiting)
+        :return: list of the building's Floor objects
+        """
+        return [Floor(floor, self.waiting, self.zones[floor]) for floor in range(self.building.floors)]
+
+    def create_elevators(self, saturday):
+        """
+        :param saturday: boolean, depending on the Saturday/Suggested mode
+        :return: list of the building's Elevator objects
+        """
+        return [Elevator(i, saturday, self.streams, self.building) for i in range(1, len(self.building.service_floors) + 1)]
 
     def gen_client(self):
         """
-        generates Client object with arrival time, desired floor, and current floor
-
-        :return: Client object
-        """
-        # initializing the arrival rates
-        morning = [150, 400, 90, 84, 60, 120, 60, 36]
-        afternoon = [90, 120, 150, 84, 60, 400, 60, 36]
-        other = [60, 70, 60, 84, 60, 70, 60, 36]
-        # creating morning/afternoon/other arrival probabilities
-        m_prob = [morning[i] / 1000 for i in range(len(morning))]
-        a_prob = [afternoon[i] / 1000 for i in range(len(afternoon))]
-        o_prob = [other[i] / 500 for i in range(len(other))]
-        rows_in_table = [i for i in range(8)]  # each row represents a row in the given arrival rates table
-        # each tuple represents a cell in the given arrival rates table
-        arrivals = [(0, 1), (0, 1), (1, 16), (1, 16), (1, 16), (16, 26), (16, 26), (16, 26)]
-        # each tuple represents a cell in the given arrival rates table
-        destinations = [(1, 16), (16, 26), (0, 1), (1, 16), (16, 26), (0, 1), (1, 16), (16, 26)]
-        # matching the probabilities to time of simulation clock
-        if self.curr_time >= 25200 and self.curr_time <= 36000:
-            probs = m_prob
-            time = 'morning'
-        elif self.curr_time >= 54000 and self.curr_time <= 64800:
-            probs = a_prob
-            time = 'afternoon'
-        else:
-            probs = o_prob
-            time = 'other'
-        # generating a client curr_floor, desired_floor
-        row = int(np.random.choice(rows_in_table, p=probs, size=1))
-        curr_floor = arrivals[row]
-        curr_floor = np.random.randint(curr_floor[0], curr_floor[1])
-        desired_floor = destinations[row]
-        desired_floor_tmp = np.random.randint(desired_floor[0], desired_floor[1])
-        # if we created the client's desired floor as his arrival floor, choose another floor
-        while curr_floor == desired_floor_tmp:
-            desired_floor_tmp = np.random.randint(desired_floor[0], desired_floor[1])
-        desired_floor = desired_floor_tmp
-        # generate arrival time
-        if time == 'morning':
-            y = np.random.exponential(1 / (1000 / 3600))
-        elif time == 'afternoon':
-            y = np.random.exponential(1 / (1000 / 3600))
-        else:
-            y = np.random.exponential(1 / (500 / 3600))
+        reads the next arrival of the day from the arrival stream
 
-        return Client(curr_floor, desired_floor, y + self.curr_time)
+        :return: Client object, None if there are no more arrivals today
+        """
+        arrival = self.arrivals.next_arrival()
+        if arrival is None:
+            return None
+        arrival_time, curr_floor, desired_floor = arrival
+        return Client(curr_floor, desired_floor, arrival_time, self.building)
 
-    def arriving(self, event):
+    def arriving(self, floor, elevator, client):
         """
         arriving scenario
-        :param event: Event object
+        :param floor: None
+        :param elevator: None
+        :param client: arriving Client object
         :return:
         """
-        client = event.client
         current_floor = client.current_floor  # current floor number, use as index to access floor list
         self.floors[current_floor].add_to_line(client)  # add client to floor's line
-        # search for elevator in this floor
-        if not self.saturday:
-            for elevator in self.elevators:
-                # there is an Elevator in the desired floor with closed doors, open doors
-                if not elevator.start:
-                    if elevator.floor == current_floor and not elevator.doors_open and client.desired_floor in elevator.service_floors:
-                        elevator.start = True  # elevator won't open while moving
-                        hpq.heappush(self.events,
-                                     Event(client.arrival_time, "door open", current_floor, elevator.number))
-                        break  # open just one Elevator
-            if client.need_swap:  # add current and target floors to queue
-                self.order_elevator(current_floor, "down", 0)
-            else:  # client doesn't need swap
-                direction = None  # if client arrived to a floor with an open elevator, do nothing
-                if client.current_floor > client.desired_floor:
-                    direction = "down"
-                elif client.current_floor < client.desired_floor:
-                    direction = "up"
-                self.order_elevator(current_floor, direction, client.desired_floor)
-        # don't do anything if it's Saturday elevators
+        # client abandons after his patience runs out, the event loop checks the earliest deadline (see abandon)
+        self.deadlines.append((client.arrival_time + self.building.patience, client))
+        self.dispatcher.on_hall_call(self, current_floor, client)
 
         client = self.gen_client()
-        hpq.heappush(self.events, Event(client.arrival_time, "arriving", None, None, client))
+        if client is not None:
+            self.events.push(client.arrival_time, ARRIVING, None, None, client)
 
-    def door_close(self, event):
+    def door_close(self, floor, elevator, client=None):
         """
         door close scenario
-        :param event: Event object
+        :param floor: floor index
+        :param elevator: elevator number
+        :param client: None
         :return:
         """
-        floor = self.floors[event.floor]  # set floor variable to Floor object
-        elevator = self.elevators[event.elevator - 1]  # set Elevator variable to Elevator object
+        floor = self.floors[floor]  # set floor variable to Floor object
+        elevator = self.elevators[elevator - 1]  # set Elevator variable to Elevator object
         elevator.doors_open = False
-        abandoned = floor.board_clients(elevator, self.curr_time)  # add clients that arrived before door closing
-        self.abandoned += abandoned  # add abandoning clients to count
-        travel_time = elevator.travel()  # pops floor from queue and moves the elevator to next floor
-        # elevator.floor is the new floor the elevator reached
-        hpq.heappush(self.events, Event(self.curr_time + travel_time, "door open", elevator.floor, elevator.number))
+        boarding = floor.board_clients(elevator, self.curr_time)  # add clients that arrived before door closing
+        if boarding:
+            self.dispatcher.on_car_call(self, elevator, boarding)
+        self.dispatcher.next_stop(self, elevator)
 
-    def door_open(self, event):
+    def door_open(self, floor, elevator, client=None):
         """
         door open scenario
-        :param event: Event object
+        :param floor: floor index
+        :param elevator: elevator number
+        :param client: None
         :return:
         """
-        floor = self.floors[event.floor] # set floor variable to Floor object
-        elevator = self.elevators[event.elevator - 1] # set Elevator variable to Elevator object
-        self.update_elevator_capacity(elevator, event.time)  # add number of people to metrics
+        floor = self.floors[floor] # set floor variable to Floor object
+        elevator = self.elevators[elevator - 1] # set Elevator variable to Elevator object
+        self.update_elevator_capacity(elevator, self.curr_time)  # add number of people to metrics
         elevator.doors_open = True
-        service_times = floor.drop_clients(elevator, self.curr_time)  # update Simulation metrics?
-        if floor.number == 0 and not self.saturday:
-            for client in floor.line:
-                if client.got_service and not client.reorder:  # client swapping have to reorder
-                    self.order_elevator(0, "up", client.desired_floor)
-                    client.reorder = True
-        self.update_service_dist(service_times)
+        arrived = floor.drop_clients(elevator, self.curr_time)
+        for client in arrived:  # add to metrics
+            self.records.add(client, self.curr_time, elevator.number)
+        self.dispatcher.on_stop(self, floor.number, elevator)
+        if floor.number == 0:
+            for client in floor.transfers():  # clients that got off to swap call an elevator of the other zone
+                self.dispatcher.on_hall_call(self, 0, client)
         if elevator.stuck():  # if the elevator got stuck, get a fix time, push elevator fix event to event queue
-            time_to_fix = Elevator.get_fix_time()
-            hpq.heappush(self.events, Event(self.curr_time + time_to_fix, "elevator fix",
-                                            floor.number,
-                                            elevator.number))
+            self.dispatcher.on_breakdown(self, elevator)
+            time_to_fix = elevator.get_fix_time()
+            self.events.push(self.curr_time + time_to_fix, ELEVATOR_FIX, floor.number, elevator.number)
         else:  # close elevator doors
-            hpq.heappush(self.events, Event(self.curr_time + 5, "door close", elevator.floor, elevator.number))
+            self.events.push(self.curr_time + 5, DOOR_CLOSE, elevator.floor, elevator.number)
 
-    def elevator_fix(self, event):
+    def elevator_fix(self, floor, elevator, client=None):
         """
         push door open after elevator fix event to events heap
-        :param event:
+        :param floor: floor index
+        :param elevator: elevator number
+        :param client: None
         :return:
         """
-        elevator = event.elevator
         self.elevators[elevator - 1].fix_elevator()
-        hpq.heappush(self.events, Event(self.curr_time, "door open", event.floor, event.elevator))
+        self.dispatcher.on_fix(self, self.elevators[elevator - 1])
+        self.events.push(self.curr_time, DOOR_OPEN, floor, elevator)
 
-    def order_elevator(self, floor, direction, desired_floor):
+    def abandon(self, time):
         """
-        find closest elevator and add the floor desired to its queue
-        :param floor: floor the client wants to go from
-        :param desired_floor: floor the client wants to go to
-        :param direction: "up" or "down"
+        remove clients that waited too long (15 minutes by default) without getting service from their floor's line
+        deadlines come in arrival order, so only the head of the deadlines queue is checked, run_until calls it
+        before handling an event later than the earliest deadline
+        :param time: clients whose deadline is at or before this time abandon
         :return: None
         """
-        # if swap is needed, desired floor will be 0
-        # score elevators according to their distance from floor given
-        # if elevator is going the opposite direction,
-        # just add the number of floors it has left to 25 and add 25- desired
-        # avoid ordering if elevator present in floor
-        closest = 999
-        # set default elevator to be ordered
-        if 0 <= floor <= 15 and 0 <= desired_floor <= 15:  # lower range
-            candidate_elevator = 0
-        elif (floor >= 16 or floor == 0) and (desired_floor >= 16 or desired_floor == 0):  # upper range
-            candidate_elevator = 2
-        else:
-            candidate_elevator = 2
-            print("Error")
-        for elevator in self.elevators:
-            # elevator not stuck and must be able to reach from client's floor to desired floor
-            # desired floor will be 0 if client wants a swap
-            # if one of the conditions is true, don't order that elevator!
-            if elevator.is_stuck or (
-                    floor not in elevator.service_floors or desired_floor not in elevator.service_floors):  # can't order that elevator
-                continue
-            score = 999
-            if not elevator.up_set or not elevator.down_set:
-                candidate_elevator = elevator.number - 1
-                break
-            if elevator.up:  # elevator moving up
-                if elevator.floor < floor:  # client is above elevator
-                    score = floor - elevator.floor
-                elif elevator.floor > floor:  # elevator passed the floor
-                    score = (25 - elevator.floor) + (
-                            25 - floor)  # first is distance to top, second is from top to request
-            else:  # elevator going down
-                if elevator.floor > floor:  # client is below elevator
-                    score = elevator.floor - floor
-                elif elevator.floor < floor:  # elevator passed the floor
-                    score = elevator.floor + floor  # first is distance to bottom, second is from bottom to request
-            if score < closest and score != 0:  # don't order an elevator that is in that floor
-                closest = score
-                candidate_elevator = elevator.number - 1
-        elevator = self.elevators[candidate_elevator]
-        elevator.add_to_queue([floor, desired_floor], direction)
-
-    def update_service_dist(self, service_lst):
-        """
-        updating the service times distribution
-        :param service_lst: times list
-        :return:
+        deadlines = self.deadlines
+        while deadlines and deadlines[0][0] <= time:
+            _, client = deadlines.popleft()
+            if not client.got_service:  # client is still waiting in the line
+                self.floors[client.current_floor].abandon(client)
+                self.abandoned += 1
+
+    def has_waiting_clients(self, elevator):
         """
-        for time in service_lst:
-            if time <= 60:
-                self.service_dist[60] += 1
-            elif time <= 120:
-                self.service_dist[120] += 1
-            elif time <= 180:
-                self.service_dist[180] += 1
-            elif time <= 240:
-                self.service_dist[240] += 1
-            elif time <= 300:
-                self.service_dist[300] += 1
-            else:
-                self.service_dist[1000] += 1
+        :param elevator: Elevator object
+        :return: True if a client waits in one of the elevator's service floors for a ride it can give
+        """
+        return self.waiting[self.elevator_zones[elevator.number - 1]] > 0
+
+    def park_elevator(self, elevator):
+        """
+        park an idle elevator at the lobby, where idle elevators go (Elevator.travel), until it is called
+        :param elevator: Elevator object with closed doors
+        :return: None
+        """
+        elevator.floor = 0
+        elevator.up = True
+        elevator.start = False
+        self.idle_log.append((self.curr_time, elevator.number, elevator.floor, "park"))
+
+    def wake_elevator(self, elevator, kind):
+        """
+        start a parked elevator
+        :param elevator: Elevator object
+        :param kind: DOOR_OPEN to open the doors at its floor, DOOR_CLOSE to travel to its queued floors
+        :return: None
+        """
+        elevator.start = True
+        self.idle_log.append((self.curr_time, elevator.number, elevator.floor, "wake"))
+        self.events.push(self.curr_time, kind, elevator.floor, elevator.number)
+
+    def day_metrics(self):
+        """
+        service times distribution and quantile sketches of the day, from the client records
+        :return: dictionary of sketch name to QuantileSketch.to_tuple
+        """
+        records = self.records
+        service_times = records.service_times()
+        self.service_dist = dict(zip(self.service_dist, histogram(service_times, self.building.service_edges).tolist()))
+        sketches = {}
+        for name, times in (("service", service_times), ("wait", records.wait_times()),
+                            ("ride", records.ride_times())):
+            sketch = QuantileSketch()
+            sketch.add(times)
+            sketches[name] = sketch.to_tuple()
+        return sketches
 
     def update_elevator_capacity(self, elevator, time):
         """
@@ -255,20 +274,44 @@ class Simulation:
         :param time:
         :return:
         """
-        self.elevators_avg_cap[elevator.number - 1] += len(elevator.clients) * (time - elevator.prv_open_time)
-        self.capacity_dist[len(elevator.clients)] += (time - elevator.prv_open_time)
+        self.elevators_avg_cap[elevator.number - 1] += elevator.load * (time - elevator.prv_open_time)
+        self.day_capacity[elevator.load] += (time - elevator.prv_open_time)
         elevator.prv_open_time = time
 
+    def summary(self):
+        """
+        averages of the simulated days
+        capacity_dist is in percent (0 to 100) of the elevators' time with each number of clients, not a fraction,
+        the scale the original script printed (it divided 100 days by one day's time)
+        :return: dictionary of the mode, number of days and the metrics to display
+        """
+        days = len(self.abandoned_lst)
+        return {
+            "mode": self.dispatcher.name,
+            "days": days,
+            "abandoned": sum(self.abandoned_lst) / days,
+            "elevator_capacity": (self.elevator_mat.sum(axis=0) / days).tolist(),  # avg capacity per elevator
+            "service_times": {key: value / days for key, value in sorted(self.service_times.items())},
+            # p50, p95 and p99 of the service, waiting and riding times of all clients
+            "percentiles": {name: {"p{:g}".format(q * 100): sketch.quantile(q) for q in PERCENTILES}
+                            for name, sketch in self.sketches.items()},
+            # percentage of time, the values add up to about 100 (the time after an elevator's last stop is not counted)
+            "capacity_dist": {key: value / (days * len(self.elevators) * (self.simulation_time - 21600)) * 100
+                              for key, value in sorted(self.capacity_dist.items())},
+        }
+
     def plot_service_times(self):
         """
         plot service times
         :param matrix: system history matrix
         :return: None
         """
+        import matplotlib.pyplot as plt  # imported only when plotting
+        days = len(self.abandoned_lst)
         y = list(
-            map(lambda x: x[1] / 100, sorted([[key, value] for key, value in self.service_times.items()],
+            map(lambda x: x[1] / days, sorted([[key, value] for key, value in self.service_times.items()],
                                              key=lambda x: x[0])))
-        x = ["T<1", "1<T<2", "2<T<3", "3<T<4", "4<T<5", "T>5"]
+        x = bucket_labels(self.building.service_edges)
         plt.bar(x, y, align='center')
         plt.xticks(x)
         plt.xlabel('Service Time [min]')
@@ -285,10 +328,12 @@ class Simulation:
         :param matrix: system history matrix
         :return: None
         """
+        import matplotlib.pyplot as plt  # imported only when plotting
+        days = len(self.abandoned_lst)
         y = list(
-        map(lambda x: x[1] /(4 *60 * 60 * 14), sorted([[key, value] for key, value in self.capacity_dist.items()],
-                                         key=lambda x: x[0])))  # didn't divide to maintain percentage
-        x = [i for i in range(16)]
+        map(lambda x: x[1] / (days * len(self.elevators) * (self.simulation_time - 21600)) * 100, sorted([[key, value] for key, value in self.capacity_dist.items()],
+                                         key=lambda x: x[0])))  # percentage of time
+        x = [i for i in range(self.building.capacity + 1)]
         plt.bar(x, y, align='center')
         plt.xticks(x)
         plt.xlabel('Number of Clients')
@@ -299,89 +344,436 @@ class Simulation:
             plt.title('Elevator Capacity Distribution - Suggested')
         plt.show()
 
-    def run(self):
+    def run_day(self, day):
+        """
+        simulate a single day, the day index sets the random seed
+        :param day: day index
+        :return: tuple of (abandoned, service times, capacity distribution, average capacity per elevator,
+        quantile sketches)
+        """
+        self.start_day(day)
+        if self.instruments is None and self.recorder is None:
+            self.dispatcher.run_day(self)  # strategies with a fast path simulate the day, no events are left
+        self.run_until()
+        return self.end_day()
+
+    def start_day(self, day):
+        """
+        reset the simulation to 6am of a day and push the first events
+        :param day: day index, sets the random seed
+        :return: None
+        """
+        self.streams = RandomStreams(self.seed + day)  # create different seed for every day
+        self.reset_simulation(self.saturday)  # create a new day
+        self.arrivals.generate(self.streams.arrivals, day)  # generate all arrivals of the day
+        if self.recorder is not None:
+            self.recorder.start_day(day)
+        client = self.gen_client()  # first client of the day
+        # push to event queue first client's arrival
+        if client is not None:
+            self.events.push(client.arrival_time, ARRIVING, None, None, client)
+        self.dispatcher.start_day(self)
+        if self.instruments is not None:
+            self.instruments.start_day(self, day)
+
+    def run_until(self, until=None):
+        """
+        handle the day's events
+        :param until: handle the events up to this time (including) and set the clock to it,
+        None to run to the end of the day
+        :return: None
+        """
+        events = self.events
+        handlers = self.handlers
+        deadlines = self.deadlines
+        # the recorder and instruments see every handled event, the instruments innermost: the recorder records
+        # before the event is handled, the instruments measure around it (before_event/after_event)
+        before = [watcher.before_event for watcher in (self.recorder, self.instruments) if watcher is not None]
+        after = [self.instruments.after_event] if self.instruments is not None else []
+        while self.curr_time < self.simulation_time:  # while simulation clock is earlier than 20:00
+            if not events:  # no clients left and all elevators are parked
+                self.curr_time = self.simulation_time
+                self.abandon(self.curr_time)
+                break
+            if until is not None and events.next_time() > until:
+                self.curr_time = until
+                self.abandon(until)
+                break
+            event = events.pop()
+            time, _, kind, floor, elevator, client = event
+            if deadlines and deadlines[0][0] <= time:  # clients abandon before later events
+                self.abandon(time)
+            self.curr_time = time
+            if before:
+                for hook in before:
+                    hook(self, event)
+                handlers[kind](floor, elevator, client)
+                for hook in after:
+                    hook(self, event)
+            else:
+                handlers[kind](floor, elevator, client)  # the event kind is the index of its handler
+
+    def end_day(self):
+        """
+        :return: result of the day, see run_day
+        """
+        if self.instruments is not None:
+            self.instruments.end_day()
+        # normalize capacity values
+        avg_cap = [cap / (self.curr_time - 21600) for cap in self.elevators_avg_cap]
+        sketches = self.day_metrics()
+        return (self.abandoned, tuple(self.service_dist.values()), tuple(self.day_capacity.values()),
+                tuple(avg_cap), sketches)
+
+    def checkpoint(self):
+        """
+        snapshot of the whole simulation state: clock, events, floor lines, elevators, hall calls, metrics and
+        random streams, the result cache, instruments and recorder are not included
+        :return: bytes, restore with Simulation.restore
+        """
+        cache, instruments, recorder = self.cache, self.instruments, self.recorder
+        self.cache = self.instruments = self.recorder = None
+        try:
+            return pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL)
+        finally:
+            self.cache, self.instruments, self.recorder = cache, instruments, recorder
+
+    @staticmethod
+    def restore(checkpoint):
+        """
+        :param checkpoint: bytes returned by Simulation.checkpoint
+        :return: Simulation object, continue the day with run_until and end_day
+        """
+        return pickle.loads(checkpoint)
+
+    def merge_day(self, day, result):
+        """
+        add a day's result (returned by run_day) to the simulation metrics
+        :param day: day index
+        :param result: tuple returned by run_day
+        :return: None
+        """
+        abandoned, service_dist, day_capacity, avg_cap, sketches = result
+        self.abandoned_lst.append(abandoned)
+        # update service time distribution dictionary
+        for key, value in zip(self.service_times, service_dist):
+            self.service_times[key] += value
+        # update capacity distribution dictionary
+        for key, value in zip(self.capacity_dist, day_capacity):
+            self.capacity_dist[key] += value
+        # update capacity matrix
+        for j in range(len(avg_cap)):
+            self.elevator_mat[day][j] = avg_cap[j]
+        for name, sketch in sketches.items():
+            self.sketches[name].merge(QuantileSketch.from_tuple(sketch))
+
+    def day_results(self, days, workers=1, batch=False):
+        """
+        generator of day results in day order
+        :param days: range of day indexes
+        :param workers: number of worker processes
+        :param batch: if True, send days to the workers in batches of workers days,
+        so that few unneeded days are simulated when the caller stops early
+        :return: generator of run_day results
+        """
+        pool = Pool(workers) if workers > 1 and len(days) > 1 else None
+        if pool is None:  # serial runs go day by day
+            step = 1
+        elif batch:
+            step = workers
+        else:
+            step = len(days)
+        try:
+            for start in range(0, len(days), step):
+                batch_days = days[start:start + step]
+                # days found in the result cache are not simulated again, unless they are profiled or recorded
+                cached = {}
+                if self.cache is not None and self.instruments is None and self.recorder is None:
+                    for day in batch_days:
+                        result = self.cache.get(self.cache_key(day))
+                        if result is not None:
+                            cached[day] = result
+                missing = [day for day in batch_days if day not in cached]
+                if pool is not None:
+                    computed = pool.imap(simulate_day, [(self.saturday, self.seed, self.building, day, self.arrivals,
+                                                         self.dispatcher) for day in missing])
+                else:
+                    computed = map(self.run_day, missing)
+                for day in batch_days:
+                    if day in cached:
+                        yield cached[day]
+                    else:
+                        result = next(computed)
+                        if self.cache is not None:
+                            self.cache.put(self.cache_key(day), result)
+                        yield result
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+    def cache_key(self, day):
+        """
+        :param day: day index
+        :return: result cache key of the day
+        """
+        arrivals = self.arrivals.describe()
+        if arrivals is not None:  # recorded arrivals depend on the day index
+            arrivals = dict(arrivals, day=day)
+        dispatcher = self.dispatcher.name
+        if dispatcher == default_dispatcher(self.saturday).name:  # same key as Sweep.py's days of the mode
+            dispatcher = None
+        return ResultCache.key(self.saturday, self.building, self.seed + day, arrivals, dispatcher)
+
+    def run(self, workers=1, days=100, stopping=None):
         """
         main method that controls the simulation
+        days are independent, so with workers > 1 they are spread over a process pool.
+        results are merged in day order, so the output is identical to a serial run
+        :param workers: number of worker processes
+        :param days: number of days, the maximal number of days if stopping is given, 0 simulates nothing
+        :param stopping: SequentialStopping object, stop when its confidence interval targets are reached
         :return: None
         """
+        if days < 0:
+            raise ValueError("days must be 0 or more, got {}".format(days))
+        if self.instruments is not None or self.recorder is not None:  # days are measured in this process
+            workers = 1
+        self.elevator_mat = np.zeros((days, len(self.elevators)))
+        results = self.day_results(range(days), workers, batch=stopping is not None)
+        for day, result in enumerate(results):
+            self.merge_day(day, result)
+            if stopping is not None and stopping.add(result):
+                results.close()  # stop the workers
+                break
+        self.elevator_mat = self.elevator_mat[:len(self.abandoned_lst)]
 
-        for i in range(100):
-            np.random.seed(i+1)  # create different seed for every day
-            self.reset_simulation(self.saturday)  # create a new day
-            client = self.gen_client()  # generate first client of the day
-            # push to event queue first client's arrival
-            hpq.heappush(self.events, Event(client.arrival_time, "arriving", None, None, client))
-            if self.saturday:  # if saturday mode, push door open event for all elevators
-                for elevator in self.elevators:
-                    hpq.heappush(self.events, Event(self.curr_time, "door open", elevator.floor, elevator.number))
-            while self.curr_time < self.simulation_time:  # while simulation clock is earlier than 20:00
-                event = hpq.heappop(self.events)
-                self.curr_time = event.time
-                # case for dealing with different event types
-                if event.event_type == "arriving":
-                    self.arriving(event)
-                elif event.event_type == "door open":
-                    self.door_open(event)
-                elif event.event_type == "elevator fix":
-                    self.elevator_fix(event)
-                elif event.event_type == "door close":
-                    self.door_close(event)
-            for floor in self.floors:  # update abandoning clients after 20:00 (end of service)
-                for client in floor.line:
-                    if (self.curr_time - client.arrival_time) > 15 * 60 and not client.got_service:
-                        self.abandoned += 1
-            # normalize capacity values
-            avg_cap = list(map(lambda x: x / (self.curr_time - 21600), self.elevators_avg_cap))
-            self.abandoned_lst.append(self.abandoned)
-            # update service time distribution dictionary
-            for key, value in self.service_dist.items():
-                self.service_times[key] += value
-            # update capacity matrix
-            for j in range(len(avg_cap)):
-                self.elevator_mat[i][j] = avg_cap[j]
 
+def simulate_day(args):
+    """
+    worker entry point for parallel runs
+    :param args: tuple of (saturday, seed, building, day index), optionally followed by arrivals and dispatcher
+    :return: result of Simulation.run_day
+    """
+    saturday, seed, building, day = args[:4]
+    arrivals = args[4] if len(args) > 4 else None
+    dispatcher = args[5] if len(args) > 5 else None
+    return Simulation(saturday, seed, building, arrivals, dispatcher).run_day(day)
+
+
+def continue_day(args):
+    """
+    worker entry point of fork, restore a checkpoint, change it and simulate the rest of the day
+    :param args: tuple of (checkpoint, variant)
+    :return: result of the day, see Simulation.run_day
+    """
+    checkpoint, variant = args
+    sim = Simulation.restore(checkpoint)
+    if variant is not None:
+        variant(sim)
+    sim.run_until()
+    return sim.end_day()
+
+
+def fork(checkpoint, variants, workers=1):
+    """
+    continue a checkpointed day once for every variant, e.g. what if elevator 3 breaks at 8:15:
+        sim.start_day(0)
+        sim.run_until(8.25 * 3600)
+        base, broken = fork(sim.checkpoint(), [None, functools.partial(break_elevator, number=3)])
+    :param checkpoint: bytes returned by Simulation.checkpoint
+    :param variants: list of functions changing the restored Simulation, None continues it as is,
+    functions must be picklable (module level functions or functools.partial of them) when workers > 1
+    :param workers: number of worker processes
+    :return: list of day results, in the order of the variants
+    """
+    tasks = [(checkpoint, variant) for variant in variants]
+    if workers > 1:
+        with Pool(workers) as pool:
+            return pool.map(continue_day, tasks)
+    return [continue_day(task) for task in tasks]
+
+
+def break_elevator(sim, number):
+    """
+    variant of fork, the elevator gets stuck when it opens its doors next
+    :param sim: Simulation object
+    :param number: elevator number
+    :return: None
+    """
+    sim.elevators[number - 1].breakdown = True
 
-if __name__ == "__main__":
-    # ##### Saturday Mode #####
-    print('\n##### Saturday Mode #####')
-    print('\nSimulation is running...')
-    sat_sim = Simulation(True)  # True if it's Saturday
-    sat_sim.run()  # starting the simulation on Saturday mode
-    print('Done!')
-    print("\nAverage Number of Abandoning Clients: {}".format(sum(sat_sim.abandoned_lst) / 100))
-    print("\nAverage Elevators Capacity:\n")
-    print(list(map(lambda x: x/100, sat_sim.elevator_mat.sum(axis=0))))  # avg capacity per elevator
-    service_times = list(map(lambda x: x[1]/100, sorted([[key, value] for key, value in sat_sim.service_times.items()],
-                                                   key=lambda x: x[0])))  # requested service times metric
-    capacity_dist = list(
-        map(lambda x: x[1] /(4 *60 * 60 * 14), sorted([[key, value] for key, value in sat_sim.capacity_dist.items()],
-                                         key=lambda x: x[0])))
-    sat_sim.plot_capcity_dist()
-    print("\nService Times Distribution Graph Values\n")
-    print(service_times)
-    print("\nElevator Capacity Distribution Graph Values\n")
-    print(capacity_dist)
-    sat_sim.plot_service_times()
-
-    # ##### Suggested Mode #####
-    print('\n##### Suggested Mode #####')
-    print('\nSimulation is running...')
-    reg_sim = Simulation(False)  # True if it's Saturday
-    reg_sim.run()  # starting the simulation on Saturday mode
-    print('Done!')
-    print("\nAverage Number of Abandoning Clients: {}".format(sum(reg_sim.abandoned_lst) / 100))
-    print("\nAverage Elevators Capacity:\n")
-    print(list(map(lambda x: x / 100, reg_sim.elevator_mat.sum(axis=0))))  # avg capacity per elevator
-    service_times = list(
-        map(lambda x: x[1] / 100, sorted([[key, value] for key, value in reg_sim.service_times.items()],
-                                         key=lambda x: x[0])))
-    capacity_dist = list(
-        map(lambda x: x[1] / (4 * 60 * 60 * 14), sorted([[key, value] for key, value in reg_sim.capacity_dist.items()],
-                                                        key=lambda x: x[0])))  # didn't divide to maintain percentage
-    reg_sim.plot_capcity_dist()
-    print("\nService Times Distribution Graph Values\n")
-    print(service_times)
-    print("\nElevator Capacity Distribution Graph Values\n")
-    print(capacity_dist)
-    reg_sim.plot_service_times()
 
+def compare(dispatchers, days=1, seed=1, building=None, arrivals=None, step=3600, watch=None):
+    """
+    simulate the same days with several dispatchers in lockstep, in a single process
+    the arrivals of a day are generated once and replayed by every dispatcher's simulation, and the simulations
+    advance together step seconds at a time, the results are identical to separate runs with the same seed
+    :param dispatchers: list of Dispatcher objects, e.g. [SaturdayDispatcher(), SuggestedDispatcher()]
+    :param days: number of days
+    :param seed: seed of the first day
+    :param building: Building object, None for the default building
+    :param arrivals: ArrivalStream or TraceStream, None for the building's arrival rates
+    :param step: seconds of simulated time between the lockstep points
+    :param watch: function called at every lockstep point with (day, time, simulations), e.g. to compare lines
+    :return: list of Simulation objects with the merged days, in the order of the dispatchers, see summary
+    """
+    building = building if building is not None else Building()
+    if arrivals is None:
+        arrivals = ArrivalStream(21600, 72000, building.periods, building.sources, building.destinations)
+    shared = SharedArrivals(arrivals)
+    sims = [Simulation(dispatcher.saturday, seed, building, shared.view(), dispatcher) for dispatcher in dispatchers]
+    for sim in sims:
+        sim.elevator_mat = np.zeros((days, len(sim.elevators)))
+    for day in range(days):
+        for sim in sims:
+            sim.start_day(day)
+        end = sims[0].simulation_time if sims else 0
+        for time in range(21600 + step, end, step):
+            for sim in sims:
+                sim.run_until(time)
+            if watch is not None:
+                watch(day, time, sims)
+        for sim in sims:
+            sim.run_until()
+            sim.merge_day(day, sim.end_day())
+    return sims
+
+
+def write_results(results, out, fmt):
+    """
+    write simulation summaries
+    :param results: list of Simulation.summary dictionaries
+    :param out: file object
+    :param fmt: "text", "json" or "csv"
+    :return: None
+    """
+    if fmt == "json":
+        json.dump(results, out, indent=2)
+        out.write("\n")
+    elif fmt == "csv":  # tidy table, row per value
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(["mode", "days", "metric", "key", "value"])
+        for result in results:
+            rows = [("abandoned", "", result["abandoned"])]
+            rows += [("elevator_capacity", i + 1, value) for i, value in enumerate(result["elevator_capacity"])]
+            rows += [("service_times", key, value) for key, value in result["service_times"].items()]
+            rows += [("capacity_dist", key, value) for key, value in result["capacity_dist"].items()]
+            rows += [(name + "_percentiles", key, value) for name, percentiles in result["percentiles"].items()
+                     for key, value in percentiles.items()]
+            for metric, key, value in rows:
+                writer.writerow([result["mode"], result["days"], metric, key, value])
+    else:
+        for result in results:
+            out.write("\n##### {} Mode #####\n".format(result["mode"].capitalize()))
+            out.write("\nAverage Number of Abandoning Clients: {}\n".format(result["abandoned"]))
+            out.write("\nAverage Elevators Capacity:\n\n{}\n".format(result["elevator_capacity"]))
+            out.write("\nService Times Distribution Graph Values\n\n{}\n".format(list(result["service_times"].values())))
+            out.write("\nElevator Capacity Distribution Graph Values\n\n{}\n".format(list(result["capacity_dist"].values())))
+            out.write("\nService, Waiting and Riding Times Percentiles [sec]\n\n")
+            for name, percentiles in result["percentiles"].items():
+                out.write("{}: {}\n".format(name, ", ".join("{} {:.1f}".format(key, value)
+                                                             for key, value in percentiles.items())))
+
+
+def main(argv=None):
+    """
+    command line entry point, plots are drawn only with --plot
+    :param argv: command line arguments
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Elevators simulation")
+    parser.add_argument("--building", help="json file of the building, default is the 26 floors building")
+    parser.add_argument("--trace", metavar="DIR", help="replay recorded arrivals (see Arrivals.TraceStream) "
+                                                       "instead of the building's arrival rates")
+    parser.add_argument("--mode", choices=["saturday", "suggested", "both"], default="both")
+    parser.add_argument("--dispatcher", choices=["default", "zone", "timetable"], default="default",
+                        help="zone: Suggested mode with the indexed dispatcher for large buildings "
+                             "(Dispatchers.ZoneDispatcher), timetable: Saturday days simulated from the "
+                             "elevators' timetables (Dispatchers.TimetableDispatcher)")
+    parser.add_argument("--days", type=int, default=100, help="number of days, the maximum with --target")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the first day, day i uses seed + i")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--target", action="append", default=[], metavar="METRIC=HALF_WIDTH",
+                        help="stop when the confidence interval of the metric is narrower, "
+                             "metrics: {}".format(", ".join(METRICS)))
+    parser.add_argument("--service-edges", metavar="SECONDS,...",
+                        help="upper edges of the service time buckets, default is the building's (60,120,180,240,300)")
+    parser.add_argument("--format", choices=["text", "json", "csv"], default="text")
+    parser.add_argument("--output", help="output file, default is stdout")
+    parser.add_argument("--plot", action="store_true", help="plot service times and capacity distributions")
+    parser.add_argument("--record", metavar="FILE.npy",
+                        help="record the last 2^20 handled events of every mode to FILE_saturday.npy and "
+                             "FILE_suggested.npy (read with Recorder.read_events), runs on a single process")
+    parser.add_argument("--profile", action="store_true",
+                        help="measure the event loop and write a report per day and for all days to stderr, "
+                             "runs on a single process")
+    parser.add_argument("--cache", metavar="DIR", help="directory of the day results cache")
+    parser.add_argument("--cache-size", type=int, default=256, metavar="MB", help="maximal size of the cache")
+    args = parser.parse_args(argv)
+    if args.days < 1:
+        parser.error("--days must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    targets = {}
+    for target in args.target:
+        metric, sep, half_width = target.partition("=")
+        if not sep:
+            parser.error("--target {} must be METRIC=HALF_WIDTH".format(target))
+        if metric not in METRICS:
+            parser.error("--target {}: unknown metric {}, choose from {}".format(target, metric, ", ".join(METRICS)))
+        try:
+            targets[metric] = float(half_width)
+        except ValueError:
+            parser.error("--target {}: half width must be a number".format(target))
+        if not targets[metric] > 0:
+            parser.error("--target {}: half width must be positive".format(target))
+    modes = {"saturday": [True], "suggested": [False], "both": [True, False]}[args.mode]
+    building = Building.from_file(args.building) if args.building else None
+    if args.service_edges:
+        try:
+            edges = [int(edge) if edge.isdigit() else float(edge) for edge in args.service_edges.split(",")]
+            building = (building or Building()).replace(service_edges=edges)
+        except ValueError as e:
+            parser.error("--service-edges {}: {}".format(args.service_edges, e))
+    cache = ResultCache(args.cache, args.cache_size * 2 ** 20) if args.cache else None
+
+    results = []
+    for saturday in modes:
+        arrivals = TraceStream(args.trace) if args.trace else None
+        dispatcher = None
+        if args.dispatcher == "zone" and not saturday:
+            dispatcher = ZoneDispatcher()
+        elif args.dispatcher == "timetable" and saturday:
+            dispatcher = TimetableDispatcher()
+        sim = Simulation(saturday, args.seed, building, arrivals, dispatcher)
+        sim.cache = cache
+        stopping = SequentialStopping(targets) if targets else None
+        if args.profile:
+            sim.instruments = Instruments()
+        if args.record:
+            root, ext = os.path.splitext(args.record)
+            sim.recorder = EventRecorder(path="{}_{}{}".format(root, "saturday" if saturday else "suggested",
+                                                               ext or ".npy"))
+        sim.run(workers=args.workers, days=args.days, stopping=stopping)
+        if args.record:
+            sim.recorder.close()
+        if args.profile:
+            mode = "Saturday" if saturday else "Suggested"
+            for report in sim.instruments.reports:
+                sys.stderr.write(format_report(report, "{} day {}".format(mode, report["day"])))
+            sys.stderr.write(format_report(sim.instruments.aggregate(), "{} all days".format(mode)))
+        results.append(sim.summary())
+        if args.plot:
+            sim.plot_capcity_dist()
+            sim.plot_service_times()
+
+    if args.output:
+        with open(args.output, "w", newline="") as out:
+            write_results(results, out, args.format)
+    else:
+        write_results(results, sys.stdout, args.format)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import numpy as np
+
+
+class UniformStream:
+    def __init__(self, rng, low=0.0, high=1.0, block=4096):
+        """
+        uniform random numbers drawn from a Generator in prefetched blocks
+        :param rng: numpy Generator
+        :param low: lower bound
+        :param high: upper bound
+        :param block: number of values drawn at once
+        """
+        self.rng = rng
+        self.low = low
+        self.high = high
+        self.block = block
+        self.buffer = []
+        self.index = 0
+
+    def next(self):
+        """
+        :return: next random number, float
+        """
+        if self.index == len(self.buffer):  # refill the buffer
+            self.buffer = self.rng.uniform(self.low, self.high, self.block).tolist()
+            self.index = 0
+        value = self.buffer[self.index]
+        self.index += 1
+        return value
+
+    def draw(self, count):
+        """
+        :param count: number of values
+        :return: numpy array of the next count random numbers, the prefetched ones first
+        """
+        values = self.buffer[self.index:self.index + count]
+        self.index += len(values)
+        if len(values) < count:
+            return np.concatenate([values, self.rng.uniform(self.low, self.high, count - len(values))])
+        return np.array(values)
+
+
+class RandomStreams:
+    def __init__(self, seed=None):
+        """
+        independent random streams for every random component of the simulation, spawned from a single seed
+        with the same seed, Saturday and Suggested modes see the same arrivals, breakdown draws and repair times
+        (common random numbers), no matter how their events are ordered
+        :param seed: seed of the day
+        """
+        self.seed = seed
+        arrivals, breakdowns, repairs = np.random.SeedSequence(seed).spawn(3)
+        self.arrivals = np.random.default_rng(arrivals)  # whole day arrivals are drawn in batches
+        self.breakdowns = UniformStream(np.random.default_rng(breakdowns))  # elevator stuck on door open
+        self.repairs = UniformStream(np.random.default_rng(repairs), 5 * 60, 15 * 60)  # elevator fix time
+
+    def __repr__(self):
+        return "RandomStreams: seed {}".format(self.seed)
@@ -0,0 +1,127 @@
+import os
+import sys
+import csv
+import json
+import argparse
+import itertools
+from multiprocessing import Pool
+import numpy as np
+from Building import Building
+from Simulation import Simulation, simulate_day
+from Cache import ResultCache
+
+
+def expand_grid(grid):
+    """
+    all the combinations of a parameters grid
+    :param grid: dictionary of Building parameter name to list of values
+    :return: list of dictionaries of parameter name to value
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def sweep(base, grid, modes=(True, False), days=100, seed=1, workers=1, cache=None):
+    """
+    simulate every combination of the grid, all days of all scenarios are spread over the worker processes
+    :param base: Building object, parameters not in the grid take its values
+    :param grid: dictionary of Building parameter name to list of values
+    :param modes: Saturday/Suggested modes to simulate (True/False)
+    :param days: number of days of every scenario
+    :param seed: seed of the first day
+    :param workers: number of worker processes
+    :param cache: ResultCache object, only days that are not in the cache are simulated
+    :return: list of table rows (dictionaries), a row per scenario, mode and metric value
+    """
+    scenarios = [(params, base.replace(**params)) for params in expand_grid(grid)]
+    tasks = [(saturday, seed, building, day) for _, building in scenarios for saturday in modes for day in range(days)]
+    results = [None] * len(tasks)
+    if cache is not None:
+        keys = [ResultCache.key(saturday, building, seed + day) for saturday, seed, building, day in tasks]
+        results = [cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if workers > 1 and missing:
+        with Pool(workers) as pool:
+            computed = pool.map(simulate_day, [tasks[i] for i in missing],
+                                chunksize=max(1, len(missing) // (workers * 4)))
+    else:
+        computed = [simulate_day(tasks[i]) for i in missing]
+    for i, result in zip(missing, computed):
+        results[i] = result
+        if cache is not None:
+            cache.put(keys[i], result)
+
+    rows = []
+    results = iter(results)  # results are in the order of the tasks
+    for params, building in scenarios:
+        for saturday in modes:
+            sim = Simulation(saturday, seed, building)
+            sim.elevator_mat = np.zeros((days, len(sim.elevators)))
+            for day in range(days):
+                sim.merge_day(day, next(results))
+            rows += summary_rows(params, sim.summary())
+    return rows
+
+
+def summary_rows(params, summary):
+    """
+    tidy table rows of a simulation summary
+    :param params: dictionary of the scenario's parameters
+    :param summary: dictionary returned by Simulation.summary
+    :return: list of dictionaries
+    """
+    values = [("abandoned", "", summary["abandoned"])]
+    values += [("elevator_capacity", i + 1, value) for i, value in enumerate(summary["elevator_capacity"])]
+    values += [("service_times", key, value) for key, value in summary["service_times"].items()]
+    values += [("capacity_dist", key, value) for key, value in summary["capacity_dist"].items()]
+    values += [(name + "_percentiles", key, value) for name, percentiles in summary["percentiles"].items()
+               for key, value in percentiles.items()]
+    rows = []
+    for metric, key, value in values:
+        row = {name: json.dumps(value) if isinstance(value, list) else value for name, value in params.items()}
+        row.update(mode=summary["mode"], days=summary["days"], metric=metric, key=key, value=value)
+        rows.append(row)
+    return rows
+
+
+def main(argv=None):
+    """
+    command line entry point, e.g. python Sweep.py --grid "capacity=[10, 15, 20]" --grid "patience=[600, 900]"
+    :param argv: command line arguments
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Elevators simulation parameters sweep")
+    parser.add_argument("--building", help="json file of the base building, default is the 26 floors building")
+    parser.add_argument("--grid", action="append", default=[], metavar="PARAM=JSON_LIST",
+                        help="Building parameter and the list of its values")
+    parser.add_argument("--mode", choices=["saturday", "suggested", "both"], default="both")
+    parser.add_argument("--days", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", help="csv file, default is stdout")
+    parser.add_argument("--cache", metavar="DIR", help="directory of the day results cache")
+    parser.add_argument("--cache-size", type=int, default=256, metavar="MB", help="maximal size of the cache")
+    args = parser.parse_args(argv)
+    if args.days < 1:
+        parser.error("--days must be at least 1")
+
+    base = Building.from_file(args.building) if args.building else Building()
+    grid = {}
+    for item in args.grid:
+        name, _, values = item.partition("=")
+        grid[name] = json.loads(values)
+    modes = {"saturday": [True], "suggested": [False], "both": [True, False]}[args.mode]
+    cache = ResultCache(args.cache, args.cache_size * 2 ** 20) if args.cache else None
+    rows = sweep(base, grid, modes, args.days, args.seed, args.workers, cache)
+
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    writer = csv.DictWriter(out, fieldnames=list(grid) + ["mode", "days", "metric", "key", "value"],
+                            lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(rows)
+    if args.output:
+        out.close()
+
+
+if __name__ == "__main__":
+    main()
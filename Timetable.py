@@ -0,0 +1,280 @@
+import heapq as hpq
+from bisect import bisect_left, insort
+import numpy as np
+
+DWELL = 5  # seconds the doors are open at a floor
+STUCK = 0.0005  # probability an elevator gets stuck when it opens its doors, as in Elevator.stuck
+TIME_KEY = 10 ** 6  # larger than any time of the day, sorts visits by queue and then by time
+
+
+def car_timetable(elevator, start, end, breakdowns, repairs):
+    """
+    door open and close times of a Saturday elevator riding its fixed cycle (Elevator.saturday_step) all day
+    the elevator gets stuck when it opens its doors with probability STUCK, its doors stay open until it is fixed
+    :param elevator: Elevator object, at its start floor
+    :param start: time of the first door open
+    :param end: visits opening at or after end are not included
+    :param breakdowns: UniformStream of the stuck draws
+    :param repairs: UniformStream of the fix times
+    :return: tuple of (open time, close time, floor, direction after arriving, cycle state) numpy arrays of the
+             visits, and the list of the number of visits from every cycle state to the next visit of every floor
+    """
+    # the cycle is periodic, the states are generated until one repeats
+    states = [(elevator.floor, elevator.up)]
+    travels = [0]
+    seen = {states[0]: 0}
+    while True:
+        floor, up, travel_time = elevator.saturday_step(*states[-1])
+        if (floor, up) in seen:
+            break
+        seen[floor, up] = len(states)
+        states.append((floor, up))
+        travels.append(travel_time)
+    first = seen[floor, up]  # first state of the cycle
+    period = len(states) - first
+    ahead = []  # state -> floor -> visits until the next visit of the floor, None if it is never visited
+    for s in range(len(states)):
+        steps = [None] * (max(floor for floor, _ in states) + 1)
+        for k in range(1, len(states) + period):
+            next_floor = states[s + k if s + k < len(states) else first + (s + k - first) % period][0]
+            if steps[next_floor] is None:
+                steps[next_floor] = k
+        ahead.append(steps)
+    count = int((end - start) // (DWELL + min(travels[1:] or [DWELL]))) + 2  # more visits than the day can hold
+    index = np.arange(count)
+    state = np.where(index < first, index, first + (index - first) % period)
+    floors = np.array([floor for floor, _ in states])[state]
+    ups = np.array([bool(up) for _, up in states])[state]
+    travel = np.array(travels, dtype=float)[state]
+    travel[first + period::period] = travel_time  # after a lap, the cycle's first state is reached from its last
+    delay = np.zeros(count)  # seconds the doors stay open until the elevator is fixed
+    for k in np.flatnonzero(breakdowns.draw(count) <= STUCK):
+        delay[k] = repairs.next()
+        while breakdowns.next() <= STUCK:  # stuck again when the doors open after the fix
+            delay[k] += repairs.next()
+    opens = start + np.cumsum(travel) + np.concatenate(([0.0], np.cumsum(DWELL + delay)[:-1]))
+    day = opens < end
+    return opens[day], (opens + delay + DWELL)[day], floors[day], ups[day], state[day], ahead
+
+
+def handled_before(events, car, event, other_car, other_event):
+    """
+    order of two events at the same time in the event simulation, whose queue handles them in the order they were
+    pushed: an elevator's events are pushed when its previous event is handled, and its first door open by
+    Simulation.start_day, in elevator number order
+    :param events: list of the event times of every elevator, door open and door close of every visit in turn
+    :param car: elevator index of the first event
+    :param event: index of the first event in its elevator's events
+    :param other_car: elevator index of the second event
+    :param other_event: index of the second event in its elevator's events
+    :return: True if the first event is handled before the second one
+    """
+    times, other_times = events[car], events[other_car]
+    while event and other_event:  # both were pushed by earlier events, in the order those were handled
+        event -= 1
+        other_event -= 1
+        if times[event] != other_times[other_event]:
+            return times[event] < other_times[other_event]
+    return not event and (other_event > 0 or car < other_car)
+
+
+def floor_zones(building):
+    """
+    :param building: Building object
+    :return: list of the zone index of every floor, -1 for the lobby, None if zones share floors
+    """
+    zones = [-1] * building.floors
+    for zone, (low, high) in enumerate(building.zones):
+        for floor in range(low, high + 1):
+            if zones[floor] != -1:
+                return None
+            zones[floor] = zone
+    return zones
+
+
+def saturday_day(sim, arrivals):
+    """
+    simulate the rest of a Saturday day from the elevators' timetables, without events
+    every elevator's door open and close times are known in advance (breakdowns only delay them), so each client
+    waits for the next visit of an elevator of his zone at his floor in his direction, boards it at its door close
+    if it has room, and gets off at the elevator's next visit of his desired floor (the lobby if he swaps)
+    clients are matched to their first visit in bulk, the visits are then handled in time order to fill the
+    elevators first come first served, clients left behind by a full elevator wait for the next visit
+    the day's metrics are stored in the simulation, end_day gives its result
+    :param sim: Simulation object of a Saturday day, at the start of the day
+    :param arrivals: list of (arrival time, source floor, destination floor) of the day's clients
+    :return: False if the building's zones share floors and the day must be simulated with events
+    """
+    building = sim.building
+    zone_of_floor = floor_zones(building)
+    if zone_of_floor is None:
+        return False
+    start, end = sim.curr_time, sim.simulation_time
+    capacity = building.capacity
+    cars = sim.elevators
+    car_zone = [zone for zone, count in enumerate(building.elevators) for _ in range(count)]
+
+    # ##### timetables of all the visits, visit ids are consecutive per elevator #####
+    tables = [car_timetable(elevator, start, end, elevator.streams.breakdowns, elevator.streams.repairs)
+              for elevator in cars]
+    opens = np.concatenate([table[0] for table in tables])
+    closes = np.concatenate([table[1] for table in tables])
+    floors = np.concatenate([table[2] for table in tables])
+    ups = np.concatenate([table[3] for table in tables])
+    car = np.repeat(np.arange(len(cars)), [len(table[0]) for table in tables])
+    first_visit = np.concatenate(([0], np.cumsum([len(table[0]) for table in tables])))
+    # a queue is the clients of a floor going in a direction, that can take the elevators of a zone
+    zone_count = len(building.zones)
+    queue = (floors * 2 + ups) * zone_count + np.array(car_zone)[car]
+    order = np.lexsort((closes, queue))  # visits by queue, then by time
+    keys = queue[order] * TIME_KEY + closes[order]
+    next_visit = np.full(len(order), -1)  # next visit of the same queue
+    same = queue[order][1:] == queue[order][:-1]
+    next_visit[order[:-1][same]] = order[1:][same]
+
+    # ##### clients and their first visit #####
+    times = np.array([arrival[0] for arrival in arrivals], dtype=float)
+    sources = np.array([arrival[1] for arrival in arrivals], dtype=int)
+    destinations = np.array([arrival[2] for arrival in arrivals], dtype=int)
+    floor_zone = np.array(zone_of_floor)
+    source_zone, destination_zone = floor_zone[sources], floor_zone[destinations]
+    swap = (source_zone >= 0) & (destination_zone >= 0) & (source_zone != destination_zone)
+    up = (destinations > sources) & ~swap  # clients who need a swap go down to the lobby
+    zone = np.where(sources == 0, destination_zone, source_zone)
+    client_queue = (sources * 2 + up) * zone_count + zone
+    position = np.searchsorted(keys, client_queue * TIME_KEY + times)
+    found = (zone >= 0) & (position < len(keys))  # and a visit of the client's queue follows his arrival
+    found[found] = queue[order][position[found]] == client_queue[found]
+    visit = np.where(found, order[np.minimum(position, len(order) - 1)], -1)
+
+    # ##### visits in time order #####
+    opens_l, closes_l, car_l, next_l = opens.tolist(), closes.tolist(), car.tolist(), next_visit.tolist()
+    state_l = np.concatenate([table[4] for table in tables]).tolist()
+    aheads = [table[5] for table in tables]
+    events = []  # elevator -> times of its door open and door close events, for same-time ties (handled_before)
+    for table in tables:
+        car_events = np.empty(2 * len(table[0]))
+        car_events[0::2], car_events[1::2] = table[0], table[1]
+        events.append(car_events.tolist())
+    first_l = first_visit.tolist()
+    last_visit = first_visit[1:].tolist()  # visits of an elevator end before the first visit of the next one
+    lobby_up = {}  # zone -> (close times, visit ids) of the visits going up from the lobby, for swapping clients
+    for z in range(zone_count):
+        visits = order[queue[order] == zone_count + z]
+        lobby_up[z] = (closes[visits].tolist(), visits.tolist())
+    deadlines = (times + building.patience).tolist()
+    destinations_l, swap_l = destinations.tolist(), swap.tolist()
+    destination_zone_l = destination_zone.tolist()
+    board_time = [None] * len(times)  # time of first boarding
+    alight = [None] * len(times)  # time of getting off at the desired floor
+    elevator_of = [0] * len(times)
+    boarded = [0] * len(opens_l)  # clients boarding at every visit
+    dropped = [0] * len(opens_l)  # clients getting off at every visit
+    load = [0] * len(cars)
+    counted = (first_visit[:-1] - 1).tolist()  # last visit of every elevator whose drops were taken off its load
+
+    pending = {}  # visit -> ids of the clients waiting for it, in arrival order
+    for i, v in enumerate(visit.tolist()):
+        if v >= 0:
+            if v in pending:
+                pending[v].append(i)
+            else:
+                pending[v] = [i]
+    # only door closes are events, a client's drop visit is known when he boards, and the elevator's load is
+    # updated with the drops up to a visit when it is handled, as visits of an elevator are handled in order
+    heap = [(closes_l[v], v) for v in pending]
+    hpq.heapify(heap)
+    while heap:
+        time, v = hpq.heappop(heap)
+        c = car_l[v]
+        if counted[c] < v:
+            load[c] -= sum(dropped[counted[c] + 1:v + 1])
+            counted[c] = v
+        # clients who abandoned before the elevator came are skipped
+        boarding = [i for i in pending.pop(v) if board_time[i] is not None or deadlines[i] >= time]
+        free = capacity - load[c]
+        if len(boarding) > free:  # the elevator is full, the rest wait for the next one
+            left = boarding[free:]
+            boarding = boarding[:free]
+            w = next_l[v]
+            if w >= 0:
+                if w in pending:
+                    pending[w] = sorted(pending[w] + left)
+                else:
+                    pending[w] = left
+                    hpq.heappush(heap, (closes_l[w], w))
+        load[c] += len(boarding)
+        boarded[v] += len(boarding)
+        ahead = aheads[c][state_l[v]]
+        for i in boarding:
+            if board_time[i] is None:
+                board_time[i] = time
+            if swap_l[i]:  # gets off at the lobby and waits for an elevator of the other zone
+                swap_l[i] = False
+                w = v + ahead[0]
+                if w < last_visit[c]:
+                    dropped[w] += 1
+                    lobby_closes, lobby_visits = lobby_up[destination_zone_l[i]]
+                    drop = opens_l[w]
+                    k = bisect_left(lobby_closes, drop)
+                    # an elevator closing its doors as he gets off takes him if its door close is handled later
+                    while k < len(lobby_visits) and lobby_closes[k] == drop:
+                        u = lobby_visits[k]
+                        if handled_before(events, c, 2 * (w - first_l[c]), car_l[u], 2 * (u - first_l[car_l[u]]) + 1):
+                            break
+                        k += 1
+                    if k < len(lobby_visits):
+                        u = lobby_visits[k]
+                        if u in pending:
+                            insort(pending[u], i)
+                        else:
+                            pending[u] = [i]
+                            hpq.heappush(heap, (closes_l[u], u))
+            else:
+                w = v + ahead[destinations_l[i]]
+                if w < last_visit[c]:  # otherwise he rides past the end of the day
+                    dropped[w] += 1
+                    alight[i] = opens_l[w]
+                    elevator_of[i] = c + 1
+
+    # ##### metrics of the day #####
+    board_time = np.array([np.nan if t is None else t for t in board_time])
+    alight = np.array([np.nan if t is None else t for t in alight])
+    sim.abandoned = int(np.count_nonzero(np.isnan(board_time) & (times + building.patience < end)))
+    served = ~np.isnan(alight)
+    sim.records.clear()
+    sim.records.extend(times[served], board_time[served], alight[served], sources[served], destinations[served],
+                       np.array(elevator_of)[served])
+    loads = np.array(boarded) - np.array(dropped)
+    day_capacity = np.zeros(capacity + 1)
+    for c in range(len(cars)):
+        visits = slice(first_visit[c], first_visit[c + 1])
+        car_load = np.cumsum(loads[visits])[:-1]  # load from a visit's door close to the next door open
+        spans = np.diff(opens[visits])
+        day_capacity += np.bincount(car_load, weights=spans, minlength=capacity + 1)
+        sim.elevators_avg_cap[c] = float(np.dot(car_load, spans))
+    for number, value in enumerate(day_capacity.tolist()):
+        sim.day_capacity[number] += value
+    sim.curr_time = end
+    return True
+
+
+if __name__ == "__main__":
+    # without breakdowns the timetables are the event simulation's, ties included, so the service times match
+    from Simulation import Simulation
+    from Dispatchers import TimetableDispatcher
+
+    days = range(6)
+    means = []
+    for dispatcher in (None, TimetableDispatcher()):
+        sim = Simulation(True, dispatcher=dispatcher)
+        buckets = []
+        for day in days:
+            sim.start_day(day)
+            sim.streams.breakdowns.low = sim.streams.breakdowns.high = 1.0  # no elevator gets stuck
+            sim.dispatcher.run_day(sim)
+            sim.run_until()
+            buckets.append(sim.end_day()[1])
+        means.append(np.mean(buckets, axis=0))
+    assert means[0].tolist() == means[1].tolist(), means
+    print("Timetable days have the event simulation's mean service times without breakdowns")